@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+"""
+Simulates bulk tenants with a large backlog of requests for results (enough
+to keep every slot busy) sharing a
+:class:`dxlmarclient.fairshare.FairShareScheduler` with an interactive tenant
+submitting a request now and then, and checks that the interactive requests
+are not stuck behind the backlog, that no tenant runs more requests at a time
+than its cap and that requests whose deadline has passed fail without running.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import sys
+import threading
+import time
+from localmar import LocalMarService
+from dxlmarclient.client import MarClient
+from dxlmarclient.fairshare import FairShareScheduler
+
+MAX_CONCURRENCY = 4
+BULK_TENANTS = ["bulk", "batch"]
+BULK_CONCURRENCY = 3
+BULK_REQUESTS = 100
+INTERACTIVE_REQUESTS = 10
+EXPIRED_REQUESTS = 5
+LATENCY = 0.02
+# The longest an interactive request may wait: about one request running
+# ahead of it, with plenty of leeway for slow machines
+MAX_INTERACTIVE_WAIT = 10 * LATENCY
+
+
+class _Tracker(object):
+    """
+    Counts the requests run for each tenant, in total and at a time
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__running = {}
+        self.peak = {}
+        self.runs = {}
+
+    def run(self, tenant, results_context):
+        """
+        Requests the first page of results on behalf of a tenant
+        """
+        with self.__lock:
+            running = self.__running.get(tenant, 0) + 1
+            self.__running[tenant] = running
+            self.peak[tenant] = max(self.peak.get(tenant, 0), running)
+            self.runs[tenant] = self.runs.get(tenant, 0) + 1
+        try:
+            return results_context.get_results(limit=10)
+        finally:
+            with self.__lock:
+                self.__running[tenant] -= 1
+
+
+def _check(metrics, tracker, expired, errors):
+    interactive = metrics["interactive"]
+    if interactive["completed"] != INTERACTIVE_REQUESTS or \
+            any(metrics[tenant]["completed"] != BULK_REQUESTS
+                for tenant in BULK_TENANTS):
+        errors.append("Requests not completed: " + str(metrics))
+    if interactive["maxWait"] > MAX_INTERACTIVE_WAIT:
+        errors.append("Interactive request waited %.3fs behind the backlog" %
+                      interactive["maxWait"])
+    for tenant in BULK_TENANTS:
+        if tracker.peak.get(tenant, 0) > BULK_CONCURRENCY:
+            errors.append("%s tenant ran %d requests at a time (cap %d)" %
+                          (tenant, tracker.peak[tenant], BULK_CONCURRENCY))
+    if tracker.peak.get("interactive", 0) > 1:
+        errors.append("Interactive tenant ran %d requests at a time (cap 1)" %
+                      tracker.peak["interactive"])
+    if metrics["late"]["expired"] != EXPIRED_REQUESTS or \
+            tracker.runs.get("late", 0):
+        errors.append("Expired requests ran: " + str(metrics["late"]))
+    if not all(future.exception() is not None for future in expired):
+        errors.append("Expired requests did not fail")
+
+
+def main():
+    marclient = MarClient(LocalMarService(polls=1, latency=LATENCY))
+    results_context = marclient.start_search(
+        [{"name": "Processes", "outputs": ["name", "id"]}])
+    while not results_context.refresh():
+        pass
+    tracker = _Tracker()
+    errors = []
+    with FairShareScheduler(marclient, max_concurrency=MAX_CONCURRENCY,
+                            tenant_concurrency=1) as scheduler:
+        futures = []
+        for tenant in BULK_TENANTS:
+            scheduler.set_tenant(tenant, max_concurrency=BULK_CONCURRENCY)
+            futures += [scheduler.submit(tenant, tracker.run,
+                                         (tenant, results_context))
+                        for _ in range(BULK_REQUESTS)]
+        expired = [scheduler.submit("late", tracker.run,
+                                    ("late", results_context),
+                                    deadline=time.time() - 1)
+                   for _ in range(EXPIRED_REQUESTS)]
+        for _ in range(INTERACTIVE_REQUESTS):
+            time.sleep(5 * LATENCY)
+            futures.append(scheduler.submit(
+                "interactive", tracker.run, ("interactive", results_context)))
+        for future in futures:
+            future.result()
+    metrics = scheduler.metrics()
+    _check(metrics, tracker, expired, errors)
+    print("%d bulk requests (mean wait %.3fs), %d interactive requests "
+          "(max wait %.3fs), %d expired, %d errors" %
+          (sum(metrics[tenant]["completed"] for tenant in BULK_TENANTS),
+           metrics["bulk"]["meanWait"],
+           metrics["interactive"]["completed"],
+           metrics["interactive"]["maxWait"], metrics["late"]["expired"],
+           len(errors)))
+    for error in errors[:10]:
+        print("  " + error)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
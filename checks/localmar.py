@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+import json
+import random
+import re
+import threading
+import time
+from dxlclient.message import Message
+
+# The request targets of the MAR search API
+_SEARCH_TARGET = re.compile(r"^/v1/([^/]+)/(start|status|stop|results)$")
+
+
+def default_items(body):
+    """
+    Returns the result items of a search: ``57`` ``Processes`` items
+
+    :param body: The ``body`` of the request that created the search
+    :return: A ``list`` of result items
+    """
+    # pylint: disable=unused-argument
+    return [{
+        "id": str(index),
+        "count": index % 3 + 1,
+        "created_at": "2016-11-16T22:50:04.650Z",
+        "output": {"Processes|name": "p%03d" % index, "Processes|id": index}
+    } for index in range(57)]
+
+
+class _Response(object):
+    """
+    A DXL response from the :class:`LocalMarService`
+    """
+
+    def __init__(self, code, body):
+        self.payload = json.dumps({"code": code, "body": body}).encode("utf-8")
+        self.message_type = Message.MESSAGE_TYPE_RESPONSE
+
+
+class LocalMarService(object):
+    """
+    A stand-in for the McAfee Active Response (MAR) DXL service, used in place
+    of a DXL client by the checks run via ``python setup.py checks``.
+
+    Searches finish after `polls` status requests; the counts reported by each
+    status request grow linearly until then. Each response is delayed by up
+    to `latency` seconds (chosen at random), so that responses to concurrent
+    requests arrive out of order.
+    """
+
+    def __init__(self, items=default_items, polls=3, hosts=10, latency=0.0):
+        """
+        Constructor parameters:
+
+        :param items: (optional) A function which receives the ``body`` of the
+            request that created a search and returns its result items
+        :param polls: (optional) The count of status requests after which a
+            search has finished. Default value: ``3``
+        :param hosts: (optional) The count of subscribed endpoints. Default
+            value: ``10``
+        :param latency: (optional) The maximum delay (in seconds) of each
+            response. Default value: ``0.0``
+        """
+        self.__items = items
+        self.__polls = polls
+        self.__hosts = hosts
+        self.__latency = latency
+        self.__lock = threading.Lock()
+        self.__searches = {}
+        self.request_count = 0
+
+    def sync_request(self, request, timeout=None):
+        """
+        Handles a MAR search API request
+
+        :param request: The DXL request
+        :param timeout: (optional) Ignored
+        :return: The DXL response
+        """
+        # pylint: disable=unused-argument
+        payload = json.loads(request.payload.decode("utf-8"))
+        with self.__lock:
+            self.request_count += 1
+        response = self.__handle(payload)
+        if self.__latency:
+            time.sleep(random.uniform(0, self.__latency))
+        return response
+
+    def __handle(self, payload):
+        """
+        Returns the response to the payload of a request
+        """
+        if payload["target"] == "/v1/simple":
+            with self.__lock:
+                search_id = "search-" + str(len(self.__searches) + 1)
+                self.__searches[search_id] = {
+                    "items": self.__items(payload["body"]),
+                    "polls": 0
+                }
+            return _Response(201, {"id": search_id})
+        search_id, operation = _SEARCH_TARGET.match(
+            payload["target"]).groups()
+        search = self.__searches[search_id]
+        if operation == "status":
+            return _Response(200, self.__status(search))
+        if operation == "results":
+            return _Response(200, self.__results(search,
+                                                 payload["parameters"]))
+        return _Response(200, {})
+
+    def __status(self, search):
+        """
+        Returns the ``body`` of a status response (the counts grow with each
+        status request)
+        """
+        with self.__lock:
+            search["polls"] += 1
+            polls = min(search["polls"], self.__polls)
+        return {
+            "status": "FINISHED" if polls == self.__polls else "RUNNING",
+            "results": len(search["items"]) * polls // self.__polls,
+            "errors": 0,
+            "hosts": self.__hosts * polls // self.__polls,
+            "subscribedHosts": self.__hosts
+        }
+
+    @staticmethod
+    def __results(search, parameters):
+        """
+        Returns the ``body`` of a results response
+        """
+        items = search["items"]
+        text_filter = parameters.get("filter", "").lower()
+        if text_filter:
+            items = [item for item in items
+                     if any(text_filter in str(value).lower()
+                            for value in item["output"].values())]
+        sort_by = parameters.get("sortBy", "count")
+        items = sorted(items, key=lambda item: item["count"]
+                       if sort_by == "count" else item["output"].get(sort_by),
+                       reverse=parameters.get("sortDirection") == "desc")
+        offset, limit = parameters["$offset"], parameters["$limit"]
+        page = items[offset:offset + limit]
+        return {
+            "startIndex": offset,
+            "totalItems": len(items),
+            "currentItemCount": len(page),
+            "itemsPerPage": limit,
+            "items": page
+        }
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+"""
+Sorts the merged results of a sharded search, some of whose items do not
+contain the field being sorted by, and checks that those items sort last in
+both directions, via both ``get_results`` and ``top_n``.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import random
+import sys
+from localmar import LocalMarService
+from dxlmarclient.client import MarClient
+from dxlmarclient.constants import SortConstants
+
+RUNS = 50
+SORT_BY = "Files|size"
+
+
+def _items(rng):
+    items = []
+    for index in range(rng.randint(1, 40)):
+        output = {"Files|name": "f%03d" % index}
+        if rng.random() < 0.7:
+            output[SORT_BY] = rng.choice([rng.randint(0, 20),
+                                          "s%d" % rng.randint(0, 20)])
+        items.append({"id": str(index), "count": rng.randint(1, 5),
+                      "created_at": "2016-11-16T22:50:04.650Z",
+                      "output": output})
+    return items
+
+
+def _sort_key(value):
+    return (0, value, "") if isinstance(value, int) else (1, 0, value)
+
+
+def _expected(items, sort_direction):
+    values = [item["output"].get(SORT_BY) for item in items]
+    present = sorted((value for value in values if value is not None),
+                     key=_sort_key,
+                     reverse=sort_direction == SortConstants.DESC)
+    return present + [None] * (len(values) - len(present))
+
+
+def _check(results_context, items, errors):
+    for sort_direction in (SortConstants.DESC, SortConstants.ASC):
+        expected = _expected(items, sort_direction)
+        page = results_context.get_results(
+            limit=len(items), sort_by=SORT_BY,
+            sort_direction=sort_direction)["items"]
+        values = [item["output"].get(SORT_BY) for item in page]
+        if values != expected:
+            errors.append("get_results %s: %s, expected %s" %
+                          (sort_direction, values, expected))
+        count = len(items) // 2 + 1
+        values = [item["output"].get(SORT_BY) for item in results_context.top_n(
+            count, sort_by=SORT_BY, sort_direction=sort_direction)]
+        if values != expected[:count]:
+            errors.append("top_n %s: %s, expected %s" %
+                          (sort_direction, values, expected[:count]))
+
+
+def main():
+    rng = random.Random(1)
+    errors = []
+    for _ in range(RUNS):
+        items = _items(rng)
+        marclient = MarClient(LocalMarService(items=lambda body, i=items: i,
+                                              polls=1))
+        results_context = marclient.sharded_search(
+            [{"name": "Files", "outputs": ["name", "size"]}],
+            context={"maGuids": ["guid-%d" % index for index in range(3)]},
+            shard_size=3)
+        _check(results_context, items, errors)
+    print("%d result sets, %d errors" % (RUNS, len(errors)))
+    for error in errors[:10]:
+        print("  " + error)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
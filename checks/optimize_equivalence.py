@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+"""
+Optimizes randomly generated search conditions and checks that the optimized
+conditions are equivalent: they match exactly the same items as the original
+conditions (evaluated locally), and conditions that only differ in the order
+of their groups and conditions are optimized to identical conditions.
+
+``STRING`` and ``NUMBER`` outputs are evaluated as MAR does (see
+:func:`dxlmarclient.local.where`). The comparisons of other outputs (such as
+IP addresses) are evaluated as arbitrary functions of the values and
+operators, so that the only conditions the optimization may rely on for them
+are identical ones.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import json
+import random
+import sys
+import zlib
+from dxlmarclient.constants import ConditionConstants, OperatorConstants
+from dxlmarclient.constants import DataTypeConstants
+from dxlmarclient.local import where
+from dxlmarclient.query import optimize_conditions
+from dxlmarclient.schema import DEFAULT_SCHEMA
+
+RUNS = 3000
+
+_NAMES = ["csrss.exe", "cmd.exe", "explorer.exe", "svchost.exe", "cmd.com",
+          "notepad.EXE", "run.bat", "ex"]
+_NAME_VALUES = ["csrss.exe", "cmd.exe", "exe", ".exe", "cmd", "c", "s", "ex",
+                "EXE", "run.bat"]
+_NAME_OPERATORS = [OperatorConstants.EQUALS, OperatorConstants.CONTAINS,
+                   OperatorConstants.STARTS_WITH, OperatorConstants.ENDS_WITH]
+_SIZE_OPERATORS = [OperatorConstants.GREATER_THAN,
+                   OperatorConstants.GREATER_EQUAL_THAN,
+                   OperatorConstants.LESS_THAN,
+                   OperatorConstants.LESS_EQUAL_THAN, OperatorConstants.EQUALS]
+_ADDRESSES = ["10.0.0.1", "10.0.0.12", "192.168.1.10"]
+_ADDRESS_VALUES = ["10.0.0.1", "10.0", "0.1", "192.168.1.10", "1"]
+_ADDRESS_OPERATORS = [OperatorConstants.EQUALS, OperatorConstants.CONTAINS]
+
+ITEMS = [{"output": {"Files|name": name, "Files|size": size,
+                     "HostInfo|ip_address": address}}
+         for name in _NAMES for size in range(0, 400, 50)
+         for address in _ADDRESSES]
+
+
+def _condition(rng):
+    choice = rng.random()
+    if choice < 0.2:
+        condition = {
+            ConditionConstants.COND_NAME: "HostInfo",
+            ConditionConstants.COND_OUTPUT: "ip_address",
+            ConditionConstants.COND_OP: rng.choice(_ADDRESS_OPERATORS),
+            ConditionConstants.COND_VALUE: rng.choice(_ADDRESS_VALUES)
+        }
+    elif choice < 0.6:
+        condition = {
+            ConditionConstants.COND_NAME: "Files",
+            ConditionConstants.COND_OUTPUT: "name",
+            ConditionConstants.COND_OP: rng.choice(_NAME_OPERATORS),
+            ConditionConstants.COND_VALUE: rng.choice(_NAME_VALUES)
+        }
+    else:
+        condition = {
+            ConditionConstants.COND_NAME: "Files",
+            ConditionConstants.COND_OUTPUT: "size",
+            ConditionConstants.COND_OP: rng.choice(_SIZE_OPERATORS),
+            ConditionConstants.COND_VALUE: rng.choice(
+                [100, 200, 250, "100", "300"])
+        }
+    if rng.random() < 0.1:
+        condition["negated"] = rng.choice([True, "true", "false"])
+    return condition
+
+
+def _conditions(rng):
+    return {ConditionConstants.OR: [
+        {ConditionConstants.AND: [_condition(rng)
+                                  for _ in range(rng.randint(1, 3))]}
+        for _ in range(rng.randint(1, 4))]}
+
+
+def _predicate(condition):
+    key = condition[ConditionConstants.COND_NAME] + "|" + \
+        condition[ConditionConstants.COND_OUTPUT]
+    operator = condition[ConditionConstants.COND_OP]
+    value = condition[ConditionConstants.COND_VALUE]
+    negated = str(condition.get("negated", False)).lower() == "true"
+    if DEFAULT_SCHEMA.get_key_type(key) in (DataTypeConstants.STRING,
+                                           DataTypeConstants.NUMBER):
+        return where(key, operator, value, negated)
+
+    def predicate(item):
+        return (zlib.crc32(json.dumps([item["output"][key], operator, value])
+                           .encode("utf-8")) % 2 == 0) != negated
+    return predicate
+
+
+def _matching(conditions):
+    groups = [[_predicate(condition)
+               for condition in group[ConditionConstants.AND]]
+              for group in conditions[ConditionConstants.OR]]
+    return [any(all(predicate(item) for predicate in group)
+                for group in groups) for item in ITEMS]
+
+
+def _shuffled(conditions, rng):
+    groups = [{ConditionConstants.AND: rng.sample(
+        group[ConditionConstants.AND], len(group[ConditionConstants.AND]))}
+              for group in conditions[ConditionConstants.OR]]
+    rng.shuffle(groups)
+    return {ConditionConstants.OR: groups}
+
+
+def _check(conditions, rng, errors):
+    optimized = optimize_conditions(conditions)
+    for item, matched, optimized_matched in zip(
+            ITEMS, _matching(conditions), _matching(optimized)):
+        if matched != optimized_matched:
+            errors.append("%s optimized to %s differs for %s" %
+                          (conditions, optimized, item))
+            break
+    if optimize_conditions(_shuffled(conditions, rng)) != optimized:
+        errors.append("%s is not optimized to a canonical form" % conditions)
+    return sum(len(group[ConditionConstants.AND])
+               for group in conditions[ConditionConstants.OR]), \
+        sum(len(group[ConditionConstants.AND])
+            for group in optimized[ConditionConstants.OR])
+
+
+def main():
+    rng = random.Random(1)
+    errors = []
+    before = after = 0
+    for _ in range(RUNS):
+        counts = _check(_conditions(rng), rng, errors)
+        before += counts[0]
+        after += counts[1]
+    print("%d condition sets, %d conditions optimized to %d, %d errors" %
+          (RUNS, before, after, len(errors)))
+    for error in errors[:10]:
+        print("  " + error)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
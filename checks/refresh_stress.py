@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+"""
+Refreshes and reads the results of searches from many threads at once and
+checks that each results context only moves forward: its counts never
+decrease, a finished search is never reported as running again and the
+results retrieved concurrently are complete.
+"""
+
+from __future__ import absolute_import
+from __future__ import print_function
+import sys
+import threading
+from localmar import LocalMarService
+from dxlmarclient.client import MarClient
+
+SEARCHES = 40
+REFRESHERS = 8
+READERS = 4
+PAGE_SIZE = 7
+
+
+def _refresh(results_context, errors):
+    while not results_context.refresh():
+        pass
+    if not results_context.is_finished:
+        errors.append("Refresh returned True for a running search")
+
+
+def _read(results_context, done, errors):
+    last = (0, 0, False)
+    while True:
+        stopping = done.is_set()
+        current = (results_context.result_count, results_context.host_count,
+                   results_context.is_finished)
+        if current[0] < last[0] or current[1] < last[1]:
+            errors.append("Counts decreased from %s to %s" % (last, current))
+        if last[2] and not current[2]:
+            errors.append("Finished search reported as running")
+        last = current
+        if stopping:
+            return
+
+
+def _page(results_context, errors):
+    names = [item["output"]["Processes|name"] for item in
+             results_context.iter_results(0, PAGE_SIZE,
+                                          sort_by="Processes|name",
+                                          sort_direction="asc")]
+    if names != ["p%03d" % index for index in range(57)]:
+        errors.append("Incomplete results: " + str(len(names)) + " items")
+
+
+def _check_search(marclient, errors):
+    results_context = marclient.start_search(
+        [{"name": "Processes", "outputs": ["name", "id"]}])
+    done = threading.Event()
+    threads = [threading.Thread(target=_refresh,
+                                args=(results_context, errors))
+               for _ in range(REFRESHERS)]
+    threads += [threading.Thread(target=_read,
+                                 args=(results_context, done, errors))
+                for _ in range(READERS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads[:REFRESHERS]:
+        thread.join()
+    done.set()
+    for thread in threads[REFRESHERS:]:
+        thread.join()
+    if results_context.result_count != 57 or \
+            results_context.host_coverage != 1.0:
+        errors.append("Final counts not reported")
+    pagers = [threading.Thread(target=_page, args=(results_context, errors))
+              for _ in range(READERS)]
+    for thread in pagers:
+        thread.start()
+    for thread in pagers:
+        thread.join()
+
+
+def main():
+    service = LocalMarService(polls=20, latency=0.002)
+    marclient = MarClient(service)
+    errors = []
+    for _ in range(SEARCHES):
+        _check_search(marclient, errors)
+    print("%d searches, %d requests, %d errors" %
+          (SEARCHES, service.request_count, len(errors)))
+    for error in errors[:10]:
+        print("  " + error)
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -3,11 +3,60 @@
 # Copyright (c) 2017 McAfee LLC - All Rights Reserved.
 ################################################################################
 from __future__ import absolute_import
+import importlib
+import sys
 
 from ._version import __version__
-from .client import MarClient
 from .constants import SortConstants, OperatorConstants, ConditionConstants
-from .constants import ProjectionConstants, ResultConstants
+from .constants import ProjectionConstants, ResultConstants, IndicatorConstants
+from .constants import DataTypeConstants
+
+# The attributes whose modules are only imported on first access (the client
+# module imports the DXL client libraries, which dominates the time taken to
+# import this package)
+_LAZY_ATTRIBUTES = {
+    "MarClient": ".client",
+    "ResultsContext": ".results",
+    "ResultsIndex": ".index",
+    "SearchJournal": ".journal",
+    "LocalResults": ".local",
+    "where": ".local",
+    "DxlClientPool": ".pool",
+    "QueryBuilder": ".query",
+    "CompiledQuery": ".query",
+    "validate_query": ".query",
+    "optimize_conditions": ".query",
+    "CollectorSchema": ".schema",
+    "DEFAULT_SCHEMA": ".schema",
+    "SearchTimeline": ".timeline",
+    "MemoryGovernor": ".memory",
+    "FairShareScheduler": ".fairshare"
+}
+
+__all__ = ["get_version", "SortConstants", "OperatorConstants",
+           "ConditionConstants", "ProjectionConstants", "ResultConstants",
+           "IndicatorConstants", "DataTypeConstants"] + sorted(_LAZY_ATTRIBUTES)
+
+if sys.version_info >= (3, 7):
+    def __getattr__(name):
+        """
+        Imports lazily loaded attributes on first access (PEP 562)
+        """
+        if name not in _LAZY_ATTRIBUTES:
+            raise AttributeError("module '" + __name__ +
+                                 "' has no attribute '" + name + "'")
+        value = getattr(
+            importlib.import_module(_LAZY_ATTRIBUTES[name], __name__), name)
+        globals()[name] = value
+        return value
+
+    def __dir__():
+        return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
+else:
+    # Module-level __getattr__ is not supported, import eagerly
+    for _name, _module in _LAZY_ATTRIBUTES.items():
+        globals()[_name] = getattr(importlib.import_module(_module, __name__),
+                                   _name)
 
 
 def get_version():
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+"""
+Runs a batch of McAfee Active Response (MAR) searches from the command line.
+
+The search definitions are read from a JSON (or, if PyYAML is installed, YAML)
+file or from standard input. The definitions are either a ``list`` or a
+``dictionary`` with a ``searches`` ``list``. Each definition contains the
+``projections`` and the optional ``conditions``, ``context`` and ``timeout``
+of a search (see :func:`dxlmarclient.client.MarClient.search`), and an optional
+``name``:
+
+    .. code-block:: json
+
+        [{
+            "name": "ip-addresses",
+            "projections": [{
+                "name": "HostInfo",
+                "outputs": ["ip_address"]
+            }]
+        }]
+
+The searches are run concurrently (at most ``--max-concurrency`` at a time)
+and the result items of each search are written, one JSON object per line,
+to ``<name>.ndjson`` in the output directory. The timing and throughput of
+each search are written to standard error.
+
+**Example Usage**
+
+    .. code-block:: shell
+
+        python -m dxlmarclient --config dxlclient.config \\
+            --output-dir results searches.json
+"""
+
+from __future__ import absolute_import
+import argparse
+import json
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+
+def _parse_args(argv):
+    """
+    Parses the command line arguments
+
+    :param argv: The command line arguments (``None`` for ``sys.argv[1:]``)
+    :return: The ``argparse.Namespace`` containing the parsed arguments
+    """
+    parser = argparse.ArgumentParser(
+        prog="python -m dxlmarclient",
+        description="Runs a batch of McAfee Active Response (MAR) searches "
+                    "and writes their results as NDJSON")
+    parser.add_argument(
+        "searches", nargs="?", default="-",
+        help="JSON or YAML file containing the search definitions "
+             "(standard input if omitted or '-')")
+    parser.add_argument(
+        "-c", "--config", required=True,
+        help="DXL client configuration file")
+    parser.add_argument(
+        "-o", "--output-dir", default=".",
+        help="directory to which the <name>.ndjson files are written "
+             "(default: current directory)")
+    parser.add_argument(
+        "-n", "--max-concurrency", type=int, default=4,
+        help="maximum count of searches run concurrently (default: 4)")
+    parser.add_argument(
+        "-p", "--page-size", type=int, default=500,
+        help="count of result items retrieved per request (default: 500)")
+    parser.add_argument(
+        "-t", "--timeout", type=float, default=None,
+        help="default maximum time (in seconds) to wait for each search")
+    parser.add_argument(
+        "--validation", choices=["strict", "lenient", "none"],
+        default="lenient",
+        help="how the search definitions are checked against the collector "
+             "schema before running: 'strict' rejects collectors and outputs "
+             "missing from the schema, 'lenient' accepts them and 'none' "
+             "skips validation (default: lenient)")
+    return parser.parse_args(argv)
+
+
+def _load_searches(path):
+    """
+    Reads the search definitions
+
+    :param path: The path of the file (``-`` for standard input)
+    :return: A ``list`` of search definition ``dictionaries``, each with a
+        unique ``name``
+    """
+    if path == "-":
+        text = sys.stdin.read()
+    else:
+        with open(path) as searches_file:
+            text = searches_file.read()
+    try:
+        searches = json.loads(text)
+    except ValueError:
+        try:
+            import yaml
+        except ImportError:
+            raise Exception("Search definitions are not valid JSON (install "
+                            "PyYAML to read YAML definitions)")
+        searches = yaml.safe_load(text)
+    if isinstance(searches, dict):
+        searches = searches.get("searches")
+    if not isinstance(searches, list):
+        raise Exception("Search definitions must be a list")
+
+    names = set()
+    for index, search in enumerate(searches):
+        if not isinstance(search, dict) or "projections" not in search:
+            raise Exception("Search " + str(index) + ": projections are "
+                            "required")
+        name = re.sub(r"[^\w.-]", "_", str(search.get("name") or
+                                           "search-" + str(index)))
+        if name in names:
+            raise Exception("Search " + str(index) + ": duplicate name " +
+                            name)
+        names.add(name)
+        search["name"] = name
+    return searches
+
+
+def _run_search(marclient, search, args, lock):
+    """
+    Runs a search and writes its results
+
+    :return: A ``dictionary`` containing the statistics of the search
+    """
+    start_time = time.time()
+    results_context = marclient.search(
+        search["projections"], search.get("conditions"),
+        search.get("context"), timeout=search.get("timeout", args.timeout))
+    search_time = time.time() - start_time
+
+    path = os.path.join(args.output_dir, search["name"] + ".ndjson")
+    count = 0
+    size = 0
+    with open(path, "w") as output_file:
+        for item in results_context.iter_results(0, args.page_size):
+            line = json.dumps(item, separators=(",", ":")) + "\n"
+            output_file.write(line)
+            count += 1
+            size += len(line)
+    elapsed = time.time() - start_time
+
+    stats = {
+        "name": search["name"],
+        "searchId": results_context.search_id,
+        "partial": results_context.is_partial,
+        "hosts": results_context.host_count,
+        "subscribedHosts": results_context.subscribed_host_count,
+        "items": count,
+        "bytes": size,
+        "searchSeconds": search_time,
+        "fetchSeconds": elapsed - search_time,
+        "seconds": elapsed
+    }
+    with lock:
+        sys.stderr.write(
+            "%(name)s: %(items)d items, %(bytes)d bytes, hosts "
+            "%(hosts)d/%(subscribedHosts)d%(partial)s, search %(search).2fs, "
+            "fetch %(fetch).2fs, %(rate).1f items/s\n" % {
+                "name": search["name"], "items": count, "bytes": size,
+                "hosts": stats["hosts"],
+                "subscribedHosts": stats["subscribedHosts"],
+                "partial": " (partial)" if stats["partial"] else "",
+                "search": search_time, "fetch": elapsed - search_time,
+                "rate": count / elapsed if elapsed > 0 else 0.0})
+        sys.stderr.flush()
+    return stats
+
+
+def _run_searches(searches, config, args):
+    """
+    Connects to the DXL fabric and runs the searches concurrently, reporting
+    each failed search
+
+    :param searches: The ``list`` of search definitions
+    :param config: The ``dxlclient.client_config.DxlClientConfig``
+    :param args: The parsed command line arguments
+    :return: A ``tuple`` containing the count of failed searches and the
+        total count of result items written
+    """
+    # The client modules are only imported once the arguments are valid
+    from dxlclient.client import DxlClient
+    from .client import MarClient
+
+    lock = threading.Lock()
+    failures = 0
+    total_items = 0
+    with DxlClient(config) as client:
+        client.connect()
+        marclient = MarClient(client)
+        with ThreadPoolExecutor(max_workers=args.max_concurrency) as executor:
+            futures = [(search, executor.submit(_run_search, marclient,
+                                                search, args, lock))
+                       for search in searches]
+            for search, future in futures:
+                try:
+                    total_items += future.result()["items"]
+                except Exception as ex:  # pylint: disable=broad-except
+                    failures += 1
+                    logger.debug("Search failed", exc_info=True)
+                    with lock:
+                        sys.stderr.write(search["name"] + ": failed: " +
+                                         str(ex) + "\n")
+    return failures, total_items
+
+
+def main(argv=None):
+    """
+    Runs the command line interface
+
+    :param argv: (optional) The command line arguments (defaults to
+        ``sys.argv[1:]``)
+    :return: The exit code (``0`` if all of the searches succeeded)
+    """
+    args = _parse_args(argv)
+    if args.max_concurrency < 1:
+        sys.stderr.write("Max concurrency must be greater than or equal to "
+                         "1\n")
+        return 2
+
+    from .query import validate_query
+    try:
+        searches = _load_searches(args.searches)
+        if args.validation != "none":
+            for search in searches:
+                validate_query(search["projections"],
+                               search.get("conditions"), search.get("context"),
+                               strict=args.validation == "strict")
+        from dxlclient.client_config import DxlClientConfig
+        config = DxlClientConfig.create_dxl_config_from_file(args.config)
+    except Exception as ex:  # pylint: disable=broad-except
+        sys.stderr.write(str(ex) + "\n")
+        return 2
+    if not os.path.isdir(args.output_dir):
+        os.makedirs(args.output_dir)
+
+    start_time = time.time()
+    failures, total_items = _run_searches(searches, config, args)
+    elapsed = time.time() - start_time
+    sys.stderr.write(
+        "%d searches (%d failed), %d items in %.2fs, %.1f items/s\n" % (
+            len(searches), failures, total_items, elapsed,
+            total_items / elapsed if elapsed > 0 else 0.0))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
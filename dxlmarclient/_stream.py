@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+"""
+Incremental parsing of JSON documents.
+
+These helpers locate the members of JSON objects without decoding the values
+that are not needed, which allows the (potentially large) array of items in a
+MAR results response to be decoded one item at a time.
+"""
+
+from __future__ import absolute_import
+import json
+import re
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_CONTAINER_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|[\[\]{}]')
+_DECODER = json.JSONDecoder()
+
+
+def skip_whitespace(text, index):
+    """
+    Returns the index of the first non-whitespace character at or after
+    `index`
+    """
+    return _WHITESPACE.match(text, index).end()
+
+
+def skip_value(text, index):
+    """
+    Returns the index following the JSON value that starts at `index`. Objects
+    and arrays are skipped without being decoded.
+    """
+    if text[index] not in "{[":
+        return _DECODER.raw_decode(text, index)[1]
+    depth = 0
+    for match in _CONTAINER_TOKEN.finditer(text, index):
+        token = match.group()
+        if token[0] in "{[":
+            depth += 1
+        elif token[0] in "]}":
+            depth -= 1
+            if depth == 0:
+                return match.end()
+    raise ValueError("Unterminated JSON value at index " + str(index))
+
+
+def decode_value(text, index):
+    """
+    Decodes the JSON value that starts at `index`
+    """
+    return _DECODER.raw_decode(text, index)[0]
+
+
+def object_members(text, index):
+    """
+    Returns the start index of the value of each member of the JSON object that
+    starts at `index`
+
+    :return: A ``dictionary`` mapping each member name to the index at which
+        its value starts
+    """
+    index = skip_whitespace(text, index)
+    if text[index] != "{":
+        raise ValueError("Expected JSON object at index " + str(index))
+    members = {}
+    index = skip_whitespace(text, index + 1)
+    if text[index] == "}":
+        return members
+    while True:
+        key, index = _DECODER.raw_decode(text, index)
+        index = skip_whitespace(text, index)
+        if text[index] != ":":
+            raise ValueError("Expected ':' at index " + str(index))
+        index = skip_whitespace(text, index + 1)
+        members[key] = index
+        index = skip_whitespace(text, skip_value(text, index))
+        if text[index] == "}":
+            return members
+        if text[index] != ",":
+            raise ValueError("Expected ',' or '}' at index " + str(index))
+        index = skip_whitespace(text, index + 1)
+
+
+def iter_array(text, index):
+    """
+    Returns an iterator which decodes the elements of the JSON array that
+    starts at `index` one at a time
+    """
+    index = skip_whitespace(text, index)
+    if text[index] != "[":
+        raise ValueError("Expected JSON array at index " + str(index))
+    index = skip_whitespace(text, index + 1)
+    if text[index] == "]":
+        return
+    while True:
+        value, index = _DECODER.raw_decode(text, index)
+        yield value
+        index = skip_whitespace(text, index)
+        if text[index] == "]":
+            return
+        if text[index] != ",":
+            raise ValueError("Expected ',' or ']' at index " + str(index))
+        index = skip_whitespace(text, index + 1)
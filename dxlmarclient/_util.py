@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+"""
+Helpers shared by the modules of the package.
+"""
+
+from __future__ import absolute_import
+import datetime
+
+try:
+    STRING_TYPES = (str, unicode)  # pylint: disable=undefined-variable
+except NameError:
+    STRING_TYPES = (str,)
+
+
+def to_text(value):
+    """
+    Converts a value to text (``unicode`` on Python 2)
+    """
+    return u"%s" % (value,)
+
+
+def batches(items, batch_size):
+    """
+    Groups items into ``list`` batches of at most `batch_size` items
+    """
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def parse_date(value):
+    """
+    Parses a MAR timestamp (for example, ``2016-11-16T22:50:04.650Z``) into a
+    naive ``datetime`` in UTC
+
+    :param value: The timestamp (or a ``datetime``, which is returned as-is)
+    :return: The ``datetime`` (``None`` if the value cannot be parsed)
+    """
+    if isinstance(value, datetime.datetime):
+        return value
+    if not isinstance(value, STRING_TYPES):
+        return None
+    for date_format in ("%Y-%m-%dT%H:%M:%S.%fZ", "%Y-%m-%dT%H:%M:%SZ",
+                        "%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S",
+                        "%Y-%m-%d"):
+        try:
+            return datetime.datetime.strptime(value, date_format)
+        except ValueError:
+            pass
+    return None
@@ -6,11 +6,18 @@
 from __future__ import absolute_import
 import json
 import logging
+import re
 import time
 from dxlbootstrap.client import Client
 from dxlbootstrap.util import MessageUtils
 from dxlclient import Request
-from .constants import SortConstants
+from dxlclient.message import Message
+from .pool import DxlClientPool
+from .query import CompiledQuery, canonical_query, optimize_conditions
+from .query import search_request
+from .results import ResultsContext
+from .timeline import SearchTimeline
+from . import memory, sharding, sweep
 
 # Configure local logger
 logger = logging.getLogger(__name__)
@@ -18,6 +25,16 @@ logger = logging.getLogger(__name__)
 # The McAfee Active Response (MAR) search topic
 MAR_SEARCH_TOPIC = "/mcafee/mar/service/api/search"
 
+# The targets of requests that are sent with an affinity to the search
+# (start, status and stop requests of a search are sent via the same DXL client)
+MAR_SEARCH_AFFINITY_TARGET = re.compile(r"^/v1/([^/]+)/(?:start|status|stop)$")
+
+# The minimal projection used for existence and count queries
+MAR_MINIMAL_PROJECTIONS = [{
+    "name": "HostInfo",
+    "outputs": ["hostname"]
+}]
+
 
 class MarClient(Client):
     """
@@ -27,6 +44,14 @@ class MarClient(Client):
     The purpose of this client is to allow the user to perform MAR searches
     without having to focus on lower-level details such as MAR-specific DXL
     topics and message formats.
+
+    **Thread Safety**
+
+        A single :class:`MarClient` can be shared by many threads: its methods
+        keep all per-search state in local variables or in the returned
+        :class:`ResultsContext`, and no lock is held while waiting for the MAR
+        service. Changes to :attr:`poll_interval` and ``response_timeout``
+        apply to searches polled after the change.
     """
 
     # The default amount of time (in seconds) to wait before polling the MAR server for results
@@ -38,10 +63,17 @@ class MarClient(Client):
         """
         Constructor parameters:
 
-        :param dxl_client: The DXL client to use for communication with the MAR DXL service
+        :param dxl_client: The DXL client to use for communication with the MAR DXL service.
+            A ``list`` of DXL clients (or a :class:`dxlmarclient.pool.DxlClientPool`)
+            can be specified to spread requests across several connections.
         """
+        if isinstance(dxl_client, (list, tuple)):
+            dxl_client = DxlClientPool(dxl_client)
         super(MarClient, self).__init__(dxl_client)
         self.__poll_interval = self.__DEFAULT_POLL_INTERVAL
+        self.__journal = None
+        self.__optimize_conditions = True
+        self.__memory_governor = None
 
     @property
     def poll_interval(self):
@@ -58,12 +90,57 @@ class MarClient(Client):
                     self.__MIN_POLL_INTERVAL))
         self.__poll_interval = poll_interval
 
-    def search(self, projections, conditions=None, context=None):
+    @property
+    def journal(self):
+        """
+        The :class:`dxlmarclient.journal.SearchJournal` in which searches and
+        their paging progress are recorded (``None``, the default, disables
+        journaling). See :func:`resume`.
+        """
+        return self.__journal
+
+    @journal.setter
+    def journal(self, journal):
+        self.__journal = journal
+
+    @property
+    def optimize_conditions(self):
+        """
+        Whether the `conditions` of searches are minimized and canonicalized
+        before the searches are created (see
+        :func:`dxlmarclient.query.optimize_conditions`). Default value:
+        ``True``
+        """
+        return self.__optimize_conditions
+
+    @optimize_conditions.setter
+    def optimize_conditions(self, optimize):
+        self.__optimize_conditions = optimize
+
+    @property
+    def memory_governor(self):
+        """
+        The :class:`dxlmarclient.memory.MemoryGovernor` that limits the memory
+        used by pages of search results. Defaults to the process-wide governor
+        (see :func:`dxlmarclient.memory.set_default_governor`), if any.
+        """
+        if self.__memory_governor is not None:
+            return self.__memory_governor
+        return memory.get_default_governor()
+
+    @memory_governor.setter
+    def memory_governor(self, memory_governor):
+        self.__memory_governor = memory_governor
+
+    def search(self, projections, conditions=None, context=None,
+               min_host_coverage=None, min_results=None, timeout=None,
+               stop_condition=None, record_timeline=False):
         """
         Executes a search via McAfee Active Response.
 
         Once the search has completed a :class:`ResultsContext` object is
-        returned which is used to access the search results.
+        returned which is used to access the search results. To access results
+        while the search is still running use :func:`start_search` instead.
 
         .. note::
 
@@ -278,28 +355,181 @@ class MarClient(Client):
                             }
                         )
 
-        :param projections: A ``list`` containing the `projections` for the search
+        **Compiled Queries**
+
+            A query can also be built with a
+            :class:`dxlmarclient.query.QueryBuilder`, which validates the query
+            locally against the `collector` schema (unknown outputs,
+            operators that are not supported for the data type of an output,
+            etc.) and compiles it into a
+            :class:`dxlmarclient.query.CompiledQuery` whose request is only
+            serialized once. The compiled query is passed in place of the
+            `projections` and can be executed repeatedly.
+
+            **Example Usage**
+
+                .. code-block:: python
+
+                    query = QueryBuilder() \\
+                        .project("HostInfo", "hostname") \\
+                        .where("Files", "md5", OperatorConstants.EQUALS,
+                               "daac6ba6967893ddea06ed132b781529") \\
+                        .compile()
+
+                    results_context = marclient.search(query)
+
+        **Completion Criteria**
+
+            By default this method returns once the MAR server reports that the
+            search has finished. Optional completion criteria can be specified
+            to return earlier. The search returns as soon as `any` of the
+            specified criteria is met. In that case the returned
+            :class:`ResultsContext` contains the results gathered so far and its
+            :attr:`ResultsContext.is_partial` property is ``True``.
+
+            **Example Usage**
+
+                .. code-block:: python
+
+                    # Return once 90% of the endpoints have responded, or
+                    # after 60 seconds, whichever happens first
+                    results_context = marclient.search(
+                            projections=[{
+                                "name": "HostInfo",
+                                "outputs": ["hostname"]
+                            }],
+                            min_host_coverage=0.9,
+                            timeout=60
+                        )
+
+                    # Return as soon as any endpoint reports a result
+                    results_context = marclient.search(
+                            projections=projections,
+                            conditions=conditions,
+                            min_results=1
+                        )
+
+        :param projections: A ``list`` containing the `projections` for the
+            search, or a :class:`dxlmarclient.query.CompiledQuery` (in which
+            case `conditions` and `context` must not be specified)
         :param conditions: (optional) A ``dictionary`` containing the `conditions` for the search
         :param context: (optional) A ``dictionary`` containing the `context` for the search
+        :param min_host_coverage: (optional) Return once the fraction (``0.0``
+            to ``1.0``) of subscribed endpoints that have responded reaches this
+            value
+        :param min_results: (optional) Return once the count of results reaches
+            this value
+        :param timeout: (optional) Return once this amount of time (in seconds)
+            has elapsed since the search was started
+        :param stop_condition: (optional) A function which receives the
+            :class:`ResultsContext` after each status poll and returns ``True``
+            if the search should return
+        :param record_timeline: (optional) Whether to record the status
+            reported by each poll of the search (see
+            :attr:`ResultsContext.timeline`). Default value: ``False``
         :return: A :class:`ResultsContext` object which is used to access the search results.
         """
-        request_dict = {
-            "target": "/v1/simple",
-            "method": "POST",
-            "parameters": {},
-            "body": {
-                "projections": projections
-            }
-        }
+        # Start the search
+        start_time = time.time()
+        results_context = self.start_search(projections, conditions, context,
+                                            record_timeline)
+
+        # Wait until the search finishes (or the completion criteria are met)
+        self._wait_for_search(results_context, start_time, min_host_coverage,
+                              min_results, timeout, stop_condition)
+
+        # Return the results information
+        return results_context
+
+    def _wait_for_search(self, results_context, start_time,
+                         min_host_coverage=None, min_results=None,
+                         timeout=None, stop_condition=None):
+        """
+        Polls the status of a search until it finishes or one of the
+        completion criteria is met (see :func:`search`)
+
+        :param results_context: The :class:`ResultsContext` of the search
+        :param start_time: The time from which the `timeout` is measured
+        """
+        while not results_context.is_finished:
+            if min_host_coverage is not None and \
+                    results_context.subscribed_host_count and \
+                    results_context.host_coverage >= min_host_coverage:
+                break
+            if min_results is not None and \
+                    results_context.result_count >= min_results:
+                break
+            if stop_condition and stop_condition(results_context):
+                break
+            sleep_time = self.__poll_interval
+            if timeout is not None:
+                remaining = start_time + timeout - time.time()
+                if remaining <= 0:
+                    break
+                sleep_time = min(sleep_time, remaining)
+            time.sleep(sleep_time)
+            results_context.refresh()
+
+    def start_search(self, projections, conditions=None, context=None,
+                     record_timeline=False):
+        """
+        Starts a search via McAfee Active Response without waiting for it to
+        complete.
+
+        Unlike :func:`search`, this method returns as soon as the search has
+        been started. The returned :class:`ResultsContext` is `live`: its
+        counts reflect the last status reported by the MAR server and can be
+        updated by invoking :func:`ResultsContext.refresh`. Results which have
+        already been reported can be paged via
+        :func:`ResultsContext.get_results` while the search is still running.
+
+        **Example Usage**
+
+            .. code-block:: python
 
-        if conditions:
-            request_dict["body"]["condition"] = conditions
+                results_context = marclient.start_search(
+                    projections=[{
+                        "name": "HostInfo",
+                        "outputs": ["hostname"]
+                    }])
 
-        if context:
-            request_dict["body"]["context"] = context
+                while not results_context.is_finished:
+                    time.sleep(marclient.poll_interval)
+                    results_context.refresh()
+                    print "Hosts: " + str(results_context.host_count) + "/" + \\
+                        str(results_context.subscribed_host_count)
+                    results = results_context.get_results(limit=10)
+
+        See :func:`search` for a description of the parameters.
+
+        :param projections: A ``list`` containing the `projections` for the
+            search, or a :class:`dxlmarclient.query.CompiledQuery` (in which
+            case `conditions` and `context` must not be specified)
+        :param conditions: (optional) A ``dictionary`` containing the `conditions` for the search
+        :param context: (optional) A ``dictionary`` containing the `context` for the search
+        :param record_timeline: (optional) Whether to record the status
+            reported each time the search is polled (see
+            :attr:`ResultsContext.timeline`). Default value: ``False``
+        :return: A :class:`ResultsContext` object which is used to monitor the
+            progress of the search and to access its results.
+        """
+        timeline = SearchTimeline() if record_timeline else None
+        if isinstance(projections, CompiledQuery):
+            if conditions or context:
+                raise Exception("Conditions and context cannot be specified "
+                                "with a compiled query")
+            query = projections
+            request, payload = query.request, query.payload
+        else:
+            if conditions and self.__optimize_conditions:
+                conditions = optimize_conditions(conditions)
+            query = None
+            request, payload = search_request(projections, conditions,
+                                              context), None
 
-        # Create the search
-        response_dict = self._invoke_mar_search_api(request_dict)
+        # Create the search (the request of a compiled query is only
+        # serialized once)
+        response_dict = self._invoke_mar_search_api(request, payload)
 
         # Get the search identifier
         search_id = response_dict["body"]["id"]
@@ -312,37 +542,361 @@ class MarClient(Client):
             "body": {}
         })
 
-        # Wait until the search finishes
-        finished = False
-        body = None
-        while not finished:
-            response_dict = self._invoke_mar_search_api({
-                "target": "/v1/" + search_id + "/status",
-                "method": "GET",
+        journal = self.__journal
+        if journal:
+            journal.record_search(
+                search_id, query.canonical if query else
+                canonical_query(projections, conditions, context))
+
+        # Retrieve the initial status of the search
+        return ResultsContext.from_status(
+            self, search_id, self._get_search_status(search_id), timeline)
+
+    def resume(self, search_id, wait=True, timeout=None):
+        """
+        Resumes a search that was started earlier (for example, by a process
+        that has since terminated) without running it again.
+
+        The current status of the search is retrieved from the MAR server and,
+        if `wait` is ``True``, polled until the search has finished. If a
+        :attr:`journal` is configured and records paging progress for the
+        search, :func:`ResultsContext.iter_results` continues from the last
+        committed offset when invoked with ``resume=True`` (and the same
+        filter and sort order).
+
+        **Example Usage**
+
+            .. code-block:: python
+
+                results_context = marclient.resume(search_id)
+                for item in results_context.iter_results(resume=True):
+                    ...
+
+        :param search_id: The search identifier
+        :param wait: (optional) Whether to wait for the search to finish.
+            Default value: ``True``
+        :param timeout: (optional) The maximum amount of time (in seconds) to
+            wait for the search to finish
+        :return: A :class:`ResultsContext` object which is used to access the
+            search results.
+        """
+        start_time = time.time()
+        results_context = ResultsContext.from_status(
+            self, search_id, self._get_search_status(search_id))
+        if wait:
+            self._wait_for_search(results_context, start_time,
+                                  timeout=timeout)
+        return results_context
+
+    def exists(self, conditions, context=None, projections=None,
+               timeout=None):
+        """
+        Determines whether any endpoint has an item matching the specified
+        `conditions`.
+
+        The search returns as soon as the MAR server reports a first result
+        (or reports that the search has finished without results). No pages of
+        results are retrieved. If the search is still running once answered it
+        is stopped on the MAR server.
+
+        **Example Usage**
+
+            .. code-block:: python
+
+                found = marclient.exists(
+                    conditions={
+                        "or": [{
+                            "and": [{
+                                "name": "Files",
+                                "output": "md5",
+                                "op": "EQUALS",
+                                "value": "daac6ba6967893ddea06ed132b781529"
+                            }]
+                        }]
+                    })
+
+        See :func:`search` for a description of the `conditions` and `context`.
+
+        :param conditions: A ``dictionary`` containing the `conditions` for the search
+        :param context: (optional) A ``dictionary`` containing the `context` for the search
+        :param projections: (optional) A ``list`` containing the `projections`
+            for the search. Defaults to the ``hostname`` output of the
+            ``HostInfo`` collector.
+        :param timeout: (optional) The maximum amount of time (in seconds) to
+            wait for an answer. If no result has been reported by then ``False``
+            is returned.
+        :return: ``True`` if at least one result was reported, otherwise ``False``
+        """
+        results_context = self.search(
+            projections or MAR_MINIMAL_PROJECTIONS, conditions, context,
+            min_results=1, timeout=timeout)
+        if not results_context.is_finished:
+            self._stop_search(results_context.search_id)
+        return results_context.has_results
+
+    def count(self, conditions=None, context=None, projections=None,
+              timeout=None):
+        """
+        Returns the count of items matching the specified `conditions`.
+
+        With the default `projections` (the ``hostname`` output of the
+        ``HostInfo`` collector) this is the count of distinct endpoints that
+        match the `conditions`. No pages of results are retrieved.
+
+        See :func:`search` for a description of the `conditions` and `context`.
+
+        :param conditions: (optional) A ``dictionary`` containing the `conditions` for the search
+        :param context: (optional) A ``dictionary`` containing the `context` for the search
+        :param projections: (optional) A ``list`` containing the `projections`
+            for the search. Defaults to the ``hostname`` output of the
+            ``HostInfo`` collector.
+        :param timeout: (optional) The maximum amount of time (in seconds) to
+            wait for the search to finish. If the search has not finished by
+            then the count of results reported so far is returned.
+        :return: The count of items in the search results
+        """
+        results_context = self.search(
+            projections or MAR_MINIMAL_PROJECTIONS, conditions, context,
+            timeout=timeout)
+        if not results_context.is_finished:
+            self._stop_search(results_context.search_id)
+        return results_context.result_count
+
+    def sweep(self, indicators, chunk_size=100, max_concurrency=4,
+              context=None, page_size=500):
+        """
+        Checks a large number of indicators (hashes, IP addresses, file names,
+        etc.) via a set of chunked McAfee Active Response searches.
+
+        The values for each indicator type are packed into ``or`` conditions
+        of at most `chunk_size` values each. The resulting searches are run
+        concurrently (at most `max_concurrency` at a time) and each result item
+        is mapped back to the indicator value(s) it matched via its ``output``.
+
+        **Example Usage**
+
+            .. code-block:: python
+
+                hits = marclient.sweep({
+                    IndicatorConstants.MD5: md5_list,
+                    IndicatorConstants.IP: ip_list
+                })
+
+                for md5, items in hits[IndicatorConstants.MD5].items():
+                    if items:
+                        print md5 + " found on " + str(len(items)) + " item(s)"
+
+        :param indicators: A ``dictionary`` mapping the indicator type to a
+            ``list`` of values to check. The indicator type is the
+            ``<CollectorName>|<OutputName>`` key of the output to compare the
+            values with (see :class:`dxlmarclient.constants.IndicatorConstants`)
+        :param chunk_size: (optional) The maximum count of values per search.
+            Default value: ``100``
+        :param max_concurrency: (optional) The maximum count of searches to run
+            at the same time. Default value: ``4``
+        :param context: (optional) A ``dictionary`` containing the `context`
+            for each search (see :func:`search`)
+        :param page_size: (optional) The count of items to retrieve per page
+            of results. Default value: ``500``
+        :return: A ``dictionary`` mapping each indicator type to a
+            ``dictionary`` of each value to the ``list`` of result items that
+            matched it (empty if the value was not found)
+        """
+        return sweep.sweep(self, indicators, chunk_size, max_concurrency,
+                           context, page_size)
+
+    def sharded_search(self, projections, conditions=None, context=None,
+                       shard_size=1000, max_concurrency=4, page_size=500,
+                       timeout=None):
+        """
+        Executes a search scoped to a large set of Agent UUIDs (MA GUIDs) by
+        splitting the ``maGuids`` of the `context` into shards of at most
+        `shard_size` GUIDs and running one search per shard concurrently (at
+        most `max_concurrency` at a time).
+
+        Once all of the shard searches have completed their results are
+        retrieved and merged into a
+        :class:`dxlmarclient.local.MergedResultsContext`, which provides the
+        same counts and :func:`get_results` method as :class:`ResultsContext`.
+        Items with identical outputs reported by different shards are merged
+        into a single item whose ``count`` is the sum of the shard counts, and
+        sorting is applied across all shards.
+
+        **Example Usage**
+
+            .. code-block:: python
+
+                results_context = marclient.sharded_search(
+                    projections=[{
+                        "name": "Processes",
+                        "outputs": ["name"]
+                    }],
+                    context={
+                        "maGuids": ma_guids
+                    },
+                    shard_size=500)
+
+                results = results_context.get_results(sort_by="count")
+
+        See :func:`search` for a description of the `projections`,
+        `conditions` and `context`.
+
+        :param projections: A ``list`` containing the `projections` for the search
+        :param conditions: (optional) A ``dictionary`` containing the `conditions` for the search
+        :param context: A ``dictionary`` containing the `context` for the
+            search, including the ``maGuids`` to shard
+        :param shard_size: (optional) The maximum count of GUIDs per search.
+            Default value: ``1000``
+        :param max_concurrency: (optional) The maximum count of searches to run
+            at the same time. Default value: ``4``
+        :param page_size: (optional) The count of items to retrieve per page
+            of results. Default value: ``500``
+        :param timeout: (optional) The maximum amount of time (in seconds) to
+            wait for each shard search to finish (see :func:`search`)
+        :return: A :class:`dxlmarclient.local.MergedResultsContext` object which
+            is used to access the merged search results.
+        """
+        return sharding.sharded_search(self, projections, conditions, context,
+                                       shard_size, max_concurrency, page_size,
+                                       timeout)
+
+    def pivot(self, source, projections, guid_key, conditions=None,
+              context=None, batch_size=500, max_concurrency=4, page_size=500,
+              timeout=None):
+        """
+        Executes a follow-up search scoped to the hosts that reported results in
+        a previous search (for example, collecting the ``Processes`` of the
+        hosts where a ``Files`` search found a particular artifact).
+
+        The results of the `source` search are paged and the Agent UUID (MA
+        GUID) of each item is extracted as pages arrive. Each time `batch_size`
+        distinct GUIDs have been gathered a follow-up search with those GUIDs
+        as its ``maGuids`` `context` is started in the background (at most
+        `max_concurrency` at a time), so that the follow-up searches overlap
+        with the paging of the `source` search.
+
+        Once all of the follow-up searches have completed, their results are
+        merged into a :class:`dxlmarclient.local.MergedResultsContext` (see
+        :func:`sharded_search`).
+
+        **Example Usage**
+
+            .. code-block:: python
+
+                files_context = marclient.search(
+                    projections=[{
+                        "name": "HostInfo",
+                        "outputs": ["hostname"]
+                    }, {
+                        "name": "Files",
+                        "outputs": ["full_name"]
+                    }],
+                    conditions=files_conditions)
+
+                processes_context = marclient.pivot(
+                    files_context,
+                    projections=[{
+                        "name": "Processes",
+                        "outputs": ["name", "cmdline"]
+                    }],
+                    guid_key=lambda item: guid_by_hostname.get(
+                        item["output"]["HostInfo|hostname"]))
+
+        See :func:`search` for a description of the `projections`,
+        `conditions` and `context`.
+
+        :param source: The :class:`ResultsContext` (or
+            :class:`dxlmarclient.local.MergedResultsContext`) of the previous
+            search
+        :param projections: A ``list`` containing the `projections` for the
+            follow-up search
+        :param guid_key: The ``<CollectorName>|<OutputName>`` key of the output
+            that contains the Agent UUID of the host that reported each item,
+            or a function which receives a result item and returns the Agent
+            UUID (or ``None`` to skip the item)
+        :param conditions: (optional) A ``dictionary`` containing the
+            `conditions` for the follow-up search
+        :param context: (optional) A ``dictionary`` containing additional
+            `context` for the follow-up search
+        :param batch_size: (optional) The maximum count of GUIDs per follow-up
+            search. Default value: ``500``
+        :param max_concurrency: (optional) The maximum count of follow-up
+            searches to run at the same time. Default value: ``4``
+        :param page_size: (optional) The count of items to retrieve per page
+            of results. Default value: ``500``
+        :param timeout: (optional) The maximum amount of time (in seconds) to
+            wait for each follow-up search to finish (see :func:`search`)
+        :return: A :class:`dxlmarclient.local.MergedResultsContext` object which
+            is used to access the merged results of the follow-up searches.
+        """
+        return sharding.pivot(self, source, projections, guid_key, conditions,
+                              context, batch_size, max_concurrency, page_size,
+                              timeout)
+
+    def _stop_search(self, search_id):
+        """
+        Requests that the MAR server stop a running search. Failures are logged
+        and otherwise ignored as the search is simply abandoned in that case.
+
+        :param search_id: The search identifier
+        """
+        try:
+            self._invoke_mar_search_api({
+                "target": "/v1/" + search_id + "/stop",
+                "method": "PUT",
                 "parameters": {},
                 "body": {}
             })
-            body = response_dict["body"]
-            finished = body["status"] == "FINISHED"
-            if not finished:
-                time.sleep(self.__poll_interval)
+        except Exception as ex:
+            logger.debug("Unable to stop search %s: %s", search_id, str(ex))
 
-        # Return the results information
-        return ResultsContext(self, search_id,
-                              body["results"], body["errors"], body["hosts"],
-                              body["subscribedHosts"])
+    def _get_search_status(self, search_id):
+        """
+        Retrieves the current status of a search
 
-    def _invoke_mar_search_api(self, payload_dict):
+        :param search_id: The search identifier
+        :return: A dictionary containing the status of the search
+        """
+        response_dict = self._invoke_mar_search_api({
+            "target": "/v1/" + search_id + "/status",
+            "method": "GET",
+            "parameters": {},
+            "body": {}
+        })
+        body = response_dict["body"]
+
+        journal = self.__journal
+        if journal:
+            journal.update_status(search_id, body["status"], body["results"],
+                                  body["errors"], body["hosts"],
+                                  body["subscribedHosts"])
+        return body
+
+    def _invoke_mar_search_api(self, payload_dict, payload=None):
         """
         Executes a query against the MAR search API
 
         :param payload_dict: The payload
+        :param payload: (optional) The already encoded payload
         :return: A dictionary containing the results of the query
         """
+        return self._process_mar_search_response(
+            self._send_mar_search_request(payload_dict, payload))
+
+    def _send_mar_search_request(self, payload_dict, payload=None):
+        """
+        Sends a request to the MAR search API
+
+        :param payload_dict: The payload
+        :param payload: (optional) The already encoded payload
+        :return: The DXL response
+        """
         # Create the request message
         req = Request(MAR_SEARCH_TOPIC)
         # Set the payload
-        req.payload = json.dumps(payload_dict).encode(encoding="UTF-8")
+        if payload is None:
+            payload = json.dumps(payload_dict).encode(encoding="UTF-8")
+        req.payload = payload
 
         # Display the request that is going to be sent
         logger.debug("Request:\n%s",
@@ -350,8 +904,41 @@ class MarClient(Client):
                                 separators=(',', ': ')))
 
         # Send the request and wait for a response (synchronous)
-        res = self._dxl_sync_request(req)
+        match = MAR_SEARCH_AFFINITY_TARGET.match(payload_dict["target"])
+        return self._dxl_sync_request(req, match.group(1) if match else None)
+
+    def _dxl_sync_request(self, request, affinity=None):
+        """
+        Performs a synchronous DXL request. Raises an exception if an error occurs.
+
+        :param request: The request to send
+        :param affinity: (optional) A key identifying related requests that
+            should be sent via the same DXL client of a
+            :class:`dxlmarclient.pool.DxlClientPool`
+        :return: The DXL response
+        """
+        if affinity is None or \
+                not isinstance(self._dxl_client, DxlClientPool):
+            return super(MarClient, self)._dxl_sync_request(request)
+
+        # Send the request and wait for a response (synchronous)
+        res = self._dxl_client.sync_request(
+            request, timeout=self._response_timeout, affinity=affinity)
+
+        if res.message_type != Message.MESSAGE_TYPE_ERROR:
+            return res
+        raise Exception("Error: " + res.error_message + " (" +
+                        str(res.error_code) + ")")
 
+    @staticmethod
+    def _process_mar_search_response(res):
+        """
+        Converts a response from the MAR search API to a dictionary, raising an
+        exception if the response indicates a failure
+
+        :param res: The DXL response
+        :return: A dictionary containing the results of the query
+        """
         # Return a dictionary corresponding to the response payload
         resp_dict = MessageUtils.json_payload_to_dict(res)
         # Display the response
@@ -375,149 +962,3 @@ class MarClient(Client):
         else:
             raise Exception("Error: unable to find response code")
         return resp_dict
-
-
-class ResultsContext(object):
-    """
-    This object is used to access to the results of a MAR search (see :func:`MarClient.search`).
-    """
-
-    def __init__(self, mar_client, search_id, result_count, error_count,
-                 host_count, subscribed_host_count):
-        self.__mar_client = mar_client
-        self.__search_id = search_id
-        self.__result_count = result_count
-        self.__error_count = error_count
-        self.__host_count = host_count
-        self.__subscribed_host_count = subscribed_host_count
-
-    @property
-    def has_results(self):
-        """
-        Whether the search has results
-        """
-        return self.__result_count > 0
-
-    @property
-    def result_count(self):
-        """
-        The total count of items available in the search results
-        """
-        return self.__result_count
-
-    @property
-    def error_count(self):
-        """
-        The count of errors that were reported during the search
-        """
-        return self.__error_count
-
-    @property
-    def host_count(self):
-        """
-        The count of endpoints that responded to the search
-        """
-        return self.__host_count
-
-    @property
-    def subscribed_host_count(self):
-        """
-        The count of endpoints that were connected to the DXL fabric when the search started
-        """
-        return self.__subscribed_host_count
-
-    def get_results(self, offset=0, limit=20, text_filter="", sort_by="count",
-                    sort_direction=SortConstants.DESC):
-        """
-        This method is used to retrieve a particular set of results from a MAR search.
-
-        **Results**
-
-            Each search result item has the following fields:
-
-            * ``id``: The identifier of the item within the search results
-            * ``count``: The number of times that the search result was reported
-            * ``created_at``: The item timestamp
-            * ``output``: The search result data where each key is composed of
-              ``<CollectorName>|<OutputName>`` and the value that correspond to
-              that `collector` and `output name`.
-
-            The python ``dictionary`` below is an example of a result that would
-            be returned from the following textual search:
-
-            ``Processes name, id where Processes name equals "csrss" and
-            Processes name contains "exe" or Processes size not greater than
-            200``
-
-            .. code-block:: python
-
-                {
-                    "startIndex": 0,
-                    "totalItems": 2,
-                    "currentItemCount": 2,
-                    "itemsPerPage": 20,
-                    "items": [
-                        {
-                            "id": "{1=[[System Process], 0]}",
-                            "count": 2,
-                            "created_at": "2016-11-16T22:50:04.650Z",
-                            "output": {
-                                "Processes|id": 0,
-                                "Processes|name": "[System Process]"
-                            }
-                        },
-                        {
-                            "id": "{1=[System, 4]}",
-                            "count": 1,
-                            "created_at": "2016-11-16T22:50:04.650Z",
-                            "output": {
-                                "Processes|id": 4,
-                                "Processes|name": "System"
-                            }
-                        }
-                    ]
-                }
-
-        **Example Usage**
-
-            .. code-block:: python
-
-                results = results_context.get_results(sort_by="Processes|name",
-                    sort_direction="asc")
-
-                # Display items
-                for item in results["items"]:
-                    print "    " + item["output"]["Processes|name"]
-
-        :param offset: (optional) Index of the first result item to be returned.
-            This value is ``0`` based. Default value: ``0``
-        :param limit: (optional) The maximum number of items to return in the
-            results. Default value: ``20``
-        :param text_filter: (optional) A text based filter to limit the results
-            (this can be any string)
-        :param sort_by: (optional) The field that will be used to sort the results.
-            Default value: ``count``
-        :param sort_direction: (optional) values: ascending ``asc`` or
-            descending ``desc`` (String). Default value: ``desc``
-        :return: A ``dictionary`` containing the specified results from the search.
-        """
-
-        # Get the search results
-        search_result = \
-            self.__mar_client._invoke_mar_search_api({
-                "target": "/v1/" + self.__search_id + "/results",
-                "method": "GET",
-                "parameters": {
-                    "$offset": offset,
-                    "$limit": limit,
-                    "filter": text_filter,
-                    "sortBy": sort_by,
-                    "sortDirection": sort_direction
-                },
-                "body": {}
-            })
-
-        if "body" not in search_result:
-            raise Exception("Unable to find 'body' in search result.")
-
-        return search_result["body"]
@@ -73,6 +73,23 @@ class OperatorConstants(object):
     AFTER = "AFTER"
 
 
+class DataTypeConstants(object):
+    """
+    Constants that describe the data types of `collector` outputs (see
+    :class:`dxlmarclient.schema.CollectorSchema`).
+
+    The data type of an output determines which `operators` can be used in a
+    `condition` (see :func:`dxlmarclient.client.MarClient.search`) and how its
+    values are decoded (see :class:`dxlmarclient.items.ResultItem`).
+    """
+    NUMBER = "NUMBER"
+    STRING = "STRING"
+    BOOLEAN = "BOOLEAN"
+    DATE = "DATE"
+    IPV4IPV6 = "IPV4IPV6"
+    REG_STR = "REG_STR"
+
+
 class ProjectionConstants(object):
     """
     Constants that are used to describe a `projection`.
@@ -174,3 +191,34 @@ class ResultConstants(object):
     ITEM_CREATED_AT = "created_at"
     ITEM_ID = "id"
     ITEM_OUTPUT = "output"
+
+
+class IndicatorConstants(object):
+    """
+    Constants that describe the types of indicators that can be checked via
+    :func:`dxlmarclient.client.MarClient.sweep`.
+
+    Each constant is the ``<CollectorName>|<OutputName>`` key of the output
+    that is compared with the indicator values.
+
+        The following statement:
+
+            .. code-block:: python
+
+                hits = marclient.sweep({
+                    "Files|md5": ["daac6ba6967893ddea06ed132b781529"]
+                })
+
+        Can be rewritten to use :class:`IndicatorConstants` as follows:
+
+            .. code-block:: python
+
+                hits = marclient.sweep({
+                    IndicatorConstants.MD5: ["daac6ba6967893ddea06ed132b781529"]
+                })
+    """
+    MD5 = "Files|md5"
+    SHA1 = "Files|sha1"
+    SHA256 = "Files|sha256"
+    NAME = "Files|name"
+    IP = "NetworkFlow|dst_ip"
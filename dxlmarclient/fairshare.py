@@ -0,0 +1,377 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+import heapq
+import itertools
+import logging
+import threading
+import time
+from concurrent.futures import Future
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+
+class _TenantStats(object):
+    """
+    The metrics of a tenant (guarded by the lock of the
+    :class:`FairShareScheduler`)
+    """
+
+    def __init__(self):
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.expired = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.first_submitted = None
+
+
+class _Tenant(object):
+    """
+    The queue, share and metrics of a tenant (guarded by the lock of the
+    :class:`FairShareScheduler`)
+    """
+
+    def __init__(self, weight, max_concurrency):
+        self.weight = weight
+        self.max_concurrency = max_concurrency
+        self.queue = []
+        self.running = 0
+        self.virtual_time = 0.0
+        self.stats = _TenantStats()
+
+
+class _Workers(object):
+    """
+    The worker threads of a :class:`FairShareScheduler` (guarded by its lock)
+    """
+
+    def __init__(self, max_count):
+        self.max_count = max_count
+        self.threads = []
+        self.idle = 0
+        self.shutdown = False
+
+
+class FairShareScheduler(object):
+    """
+    Shares a :class:`dxlmarclient.client.MarClient` between many tenants (for
+    example, teams of analysts) so that a tenant submitting many searches does
+    not starve the others.
+
+    Searches and requests for results are submitted on behalf of a tenant and
+    queued per tenant. At most `max_concurrency` of them run at a time, and at
+    most the `max_concurrency` of each tenant (see :func:`set_tenant`) run for
+    that tenant. Whenever a slot is free, the next work is chosen as follows:
+
+    * Work whose deadline falls within the next `urgency` seconds runs first,
+      earliest deadline first.
+    * Otherwise the tenant that has received the least service relative to its
+      `weight` runs next (stride scheduling: each dispatch advances the
+      tenant's virtual time by ``1 / weight``). A tenant with weight ``2``
+      therefore runs twice as much work as a tenant with weight ``1`` while
+      both have work queued.
+    * Within a tenant, work runs earliest deadline first, then in submission
+      order.
+
+    Work whose deadline has passed before it could be started fails with an
+    exception rather than running.
+
+    **Example Usage**
+
+        .. code-block:: python
+
+            scheduler = FairShareScheduler(marclient, max_concurrency=8)
+            scheduler.set_tenant("hunt-team", weight=1, max_concurrency=2)
+            scheduler.set_tenant("soc", weight=3)
+
+            future = scheduler.submit_search(
+                "soc", [{"name": "HostInfo", "outputs": ["hostname"]}],
+                deadline=time.time() + 60)
+            results_context = future.result()
+
+            results = scheduler.submit_get_results(
+                "soc", results_context, limit=100).result()
+
+            print scheduler.metrics()["soc"]["meanWait"]
+    """
+
+    def __init__(self, mar_client, max_concurrency=4, tenant_concurrency=2,
+                 urgency=5.0):
+        """
+        Constructor parameters:
+
+        :param mar_client: The :class:`dxlmarclient.client.MarClient`
+        :param max_concurrency: (optional) The maximum count of searches and
+            requests running at a time. Default value: ``4``
+        :param tenant_concurrency: (optional) The default maximum count of
+            searches and requests running at a time for each tenant. Default
+            value: ``2``
+        :param urgency: (optional) Work whose deadline is within this amount of
+            time (in seconds) runs before all other work. Default value:
+            ``5.0``
+        """
+        if max_concurrency < 1:
+            raise Exception("Max concurrency must be greater than or equal to 1")
+        self.__mar_client = mar_client
+        self.__tenant_concurrency = tenant_concurrency
+        self.__urgency = urgency
+        self.__condition = threading.Condition(threading.Lock())
+        self.__tenants = {}
+        self.__sequence = itertools.count()
+        self.__workers = _Workers(max_concurrency)
+
+    def set_tenant(self, tenant, weight=1, max_concurrency=None):
+        """
+        Sets the share of a tenant
+
+        :param tenant: The tenant identifier
+        :param weight: (optional) The relative share of the tenant. Default
+            value: ``1``
+        :param max_concurrency: (optional) The maximum count of searches and
+            requests running at a time for the tenant. Defaults to the
+            `tenant_concurrency` of the scheduler.
+        """
+        if weight <= 0:
+            raise Exception("Weight must be greater than 0")
+        with self.__condition:
+            state = self.__tenant(tenant)
+            state.weight = weight
+            state.max_concurrency = max_concurrency or \
+                self.__tenant_concurrency
+            self.__condition.notify_all()
+
+    def submit(self, tenant, func, args=(), kwargs=None, deadline=None):
+        """
+        Queues a function to be invoked on behalf of a tenant
+
+        :param tenant: The tenant identifier
+        :param func: The function
+        :param args: (optional) The positional arguments of the function
+        :param kwargs: (optional) The keyword arguments of the function
+        :param deadline: (optional) The time (as returned by ``time.time()``)
+            by which the function should have started
+        :return: A ``concurrent.futures.Future`` for the value returned by the
+            function
+        """
+        future = Future()
+        now = time.time()
+        with self.__condition:
+            if self.__workers.shutdown:
+                raise Exception("Scheduler has been shut down")
+            state = self.__tenant(tenant)
+            if not state.queue and not state.running:
+                # A tenant that was idle does not accumulate credit
+                state.virtual_time = max(state.virtual_time,
+                                         self.__virtual_time())
+            heapq.heappush(state.queue, (
+                float("inf") if deadline is None else deadline,
+                next(self.__sequence), now, future, func, args, kwargs or {}))
+            state.stats.submitted += 1
+            if state.stats.first_submitted is None:
+                state.stats.first_submitted = now
+            self.__ensure_worker()
+            self.__condition.notify()
+        return future
+
+    def submit_search(self, tenant, projections, conditions=None,
+                      context=None, deadline=None, **kwargs):
+        """
+        Queues a search on behalf of a tenant (see
+        :func:`dxlmarclient.client.MarClient.search`)
+
+        :param tenant: The tenant identifier
+        :param projections: A ``list`` containing the `projections` for the
+            search (or a :class:`dxlmarclient.query.CompiledQuery`)
+        :param conditions: (optional) A ``dictionary`` containing the `conditions` for the search
+        :param context: (optional) A ``dictionary`` containing the `context` for the search
+        :param deadline: (optional) The time (as returned by ``time.time()``)
+            by which the search should have started
+        :param kwargs: (optional) Further keyword arguments of
+            :func:`dxlmarclient.client.MarClient.search`
+        :return: A ``concurrent.futures.Future`` for the
+            :class:`dxlmarclient.results.ResultsContext`
+        """
+        return self.submit(tenant, self.__mar_client.search,
+                           (projections, conditions, context), kwargs,
+                           deadline)
+
+    def submit_get_results(self, tenant, results_context, deadline=None,
+                           **kwargs):
+        """
+        Queues a request for a page of results on behalf of a tenant (see
+        :func:`dxlmarclient.results.ResultsContext.get_results`)
+
+        :param tenant: The tenant identifier
+        :param results_context: The :class:`dxlmarclient.results.ResultsContext`
+        :param deadline: (optional) The time (as returned by ``time.time()``)
+            by which the request should have started
+        :param kwargs: (optional) The keyword arguments of
+            :func:`dxlmarclient.results.ResultsContext.get_results`
+        :return: A ``concurrent.futures.Future`` for the results
+        """
+        return self.submit(tenant, results_context.get_results, (), kwargs,
+                           deadline)
+
+    def metrics(self):
+        """
+        Returns the metrics of each tenant
+
+        :return: A ``dictionary`` mapping each tenant to a ``dictionary``
+            containing its ``weight``, the count of work ``submitted``,
+            ``queued``, ``running``, ``completed``, ``failed`` and ``expired``
+            (not started by its deadline), the ``meanWait`` and ``maxWait``
+            time (in seconds) from submission to start, and the ``throughput``
+            (completed work per second since the first submission)
+        """
+        now = time.time()
+        with self.__condition:
+            metrics = {}
+            for tenant, state in self.__tenants.items():
+                stats = state.stats
+                started = stats.completed + stats.failed + state.running
+                elapsed = now - stats.first_submitted \
+                    if stats.first_submitted is not None else 0.0
+                metrics[tenant] = {
+                    "weight": state.weight,
+                    "submitted": stats.submitted,
+                    "queued": len(state.queue),
+                    "running": state.running,
+                    "completed": stats.completed,
+                    "failed": stats.failed,
+                    "expired": stats.expired,
+                    "meanWait": stats.total_wait / started if started else 0.0,
+                    "maxWait": stats.max_wait,
+                    "throughput": stats.completed / elapsed if elapsed else 0.0
+                }
+            return metrics
+
+    def shutdown(self, wait=True):
+        """
+        Stops accepting work. Work already queued still runs.
+
+        :param wait: (optional) Whether to wait for the queued work to
+            complete. Default value: ``True``
+        """
+        with self.__condition:
+            self.__workers.shutdown = True
+            self.__condition.notify_all()
+            workers = list(self.__workers.threads)
+        if wait:
+            for worker in workers:
+                worker.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    def __tenant(self, tenant):
+        """
+        Returns the state of a tenant, creating it if necessary (must be called
+        with the lock held)
+        """
+        state = self.__tenants.get(tenant)
+        if state is None:
+            state = _Tenant(1, self.__tenant_concurrency)
+            self.__tenants[tenant] = state
+        return state
+
+    def __virtual_time(self):
+        """
+        The lowest virtual time of the tenants with queued or running work
+        (must be called with the lock held)
+        """
+        times = [state.virtual_time for state in self.__tenants.values()
+                 if state.queue or state.running]
+        return min(times) if times else 0.0
+
+    def __ensure_worker(self):
+        """
+        Starts a worker thread if none is idle and the maximum has not been
+        reached (must be called with the lock held)
+        """
+        workers = self.__workers
+        if workers.idle or len(workers.threads) >= workers.max_count:
+            return
+        worker = threading.Thread(target=self.__work,
+                                  name="FairShareScheduler-" +
+                                  str(len(workers.threads)))
+        worker.daemon = True
+        workers.threads.append(worker)
+        worker.start()
+
+    def __next_work(self, now):
+        """
+        Removes and returns the next work to run, or ``None`` if no work can
+        run (must be called with the lock held)
+
+        :return: A ``tuple`` containing the tenant state and the queue entry
+        """
+        eligible = [state for state in self.__tenants.values()
+                    if state.queue and state.running < state.max_concurrency]
+        if not eligible:
+            return None
+        urgent = [state for state in eligible
+                  if state.queue[0][0] <= now + self.__urgency]
+        if urgent:
+            state = min(urgent, key=lambda s: s.queue[0][:2])
+        else:
+            state = min(eligible, key=lambda s: (s.virtual_time,
+                                                 s.queue[0][:2]))
+        state.virtual_time += 1.0 / state.weight
+        return state, heapq.heappop(state.queue)
+
+    def __work(self):
+        """
+        Runs queued work (the body of each worker thread)
+        """
+        while True:
+            with self.__condition:
+                while True:
+                    now = time.time()
+                    work = self.__next_work(now)
+                    if work is not None:
+                        break
+                    if self.__workers.shutdown and not any(
+                            state.queue for state in self.__tenants.values()):
+                        return
+                    self.__workers.idle += 1
+                    self.__condition.wait()
+                    self.__workers.idle -= 1
+                state, entry = work
+                deadline, _, submitted, future, func, args, kwargs = entry
+                if not future.set_running_or_notify_cancel():
+                    continue
+                wait = now - submitted
+                state.stats.total_wait += wait
+                state.stats.max_wait = max(state.stats.max_wait, wait)
+                if deadline < now:
+                    state.stats.expired += 1
+                    state.stats.failed += 1
+                    future.set_exception(Exception(
+                        "Deadline passed before the work could be started"))
+                    continue
+                state.running += 1
+
+            try:
+                result = func(*args, **kwargs)
+            except Exception as ex:  # pylint: disable=broad-except
+                logger.debug("Scheduled work failed", exc_info=True)
+                with self.__condition:
+                    state.running -= 1
+                    state.stats.failed += 1
+                    self.__condition.notify_all()
+                future.set_exception(ex)
+            else:
+                with self.__condition:
+                    state.running -= 1
+                    state.stats.completed += 1
+                    self.__condition.notify_all()
+                future.set_result(result)
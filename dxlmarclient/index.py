@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+from .constants import ResultConstants
+
+
+class ResultsIndex(object):
+    """
+    A local store of MAR search result items with hash indexes on selected
+    ``<CollectorName>|<OutputName>`` keys.
+
+    The index supports point lookups, group-by counts and joins with the
+    results of another search without scanning all of the items.
+
+    **Example Usage**
+
+        .. code-block:: python
+
+            files = ResultsIndex.from_results_context(
+                files_context, ["HostInfo|hostname", "Files|sha1"])
+            processes = ResultsIndex.from_results_context(
+                processes_context, ["HostInfo|hostname"])
+
+            # Items reporting a particular SHA-1
+            items = files.lookup("Files|sha1", sha1)
+
+            # Count of items per host
+            counts = files.group_count("HostInfo|hostname")
+
+            # Files and processes reported by the same host
+            for file_item, process_item in files.join(processes,
+                                                      "HostInfo|hostname"):
+                print file_item["output"]["Files|sha1"] + " " + \\
+                    process_item["output"]["Processes|name"]
+    """
+
+    def __init__(self, keys):
+        """
+        Constructor parameters:
+
+        :param keys: A ``list`` of the ``<CollectorName>|<OutputName>`` keys to
+            index
+        """
+        self.__items = []
+        self.__indexes = {}
+        for key in keys:
+            self.__indexes[key] = {}
+
+    @classmethod
+    def from_results_context(cls, results_context, keys, page_size=500):
+        """
+        Creates an index containing all of the result items of a search
+
+        :param results_context: The :class:`dxlmarclient.results.ResultsContext`
+            of the search
+        :param keys: A ``list`` of the ``<CollectorName>|<OutputName>`` keys to
+            index
+        :param page_size: (optional) The count of items to retrieve per page
+            of results. Default value: ``500``
+        :return: A :class:`ResultsIndex`
+        """
+        index = cls(keys)
+        index.add_results_context(results_context, page_size)
+        return index
+
+    @property
+    def keys(self):
+        """
+        The ``<CollectorName>|<OutputName>`` keys that are indexed
+        """
+        return list(self.__indexes)
+
+    @property
+    def items(self):
+        """
+        All of the result items in the index
+        """
+        return list(self.__items)
+
+    def __len__(self):
+        return len(self.__items)
+
+    def add_results_context(self, results_context, page_size=500):
+        """
+        Adds the result items of a search to the index. The indexes are updated
+        as each page of results is received.
+
+        :param results_context: The :class:`dxlmarclient.results.ResultsContext`
+            of the search
+        :param page_size: (optional) The count of items to retrieve per page
+            of results. Default value: ``500``
+        """
+        self.add_items(results_context._iter_items(0, page_size))
+
+    def add_items(self, items):
+        """
+        Adds result items to the index
+
+        :param items: An iterable of result items
+        """
+        for item in items:
+            self.__items.append(item)
+            output = item[ResultConstants.ITEM_OUTPUT]
+            for key, index in self.__indexes.items():
+                if key in output:
+                    index.setdefault(output[key], []).append(item)
+
+    def add_index(self, key):
+        """
+        Adds an index on a ``<CollectorName>|<OutputName>`` key, indexing the
+        items already in the store
+
+        :param key: The ``<CollectorName>|<OutputName>`` key to index
+        """
+        if key in self.__indexes:
+            return
+        index = {}
+        for item in self.__items:
+            output = item[ResultConstants.ITEM_OUTPUT]
+            if key in output:
+                index.setdefault(output[key], []).append(item)
+        self.__indexes[key] = index
+
+    def lookup(self, key, value):
+        """
+        Returns the items whose output for the specified key equals the value
+
+        :param key: An indexed ``<CollectorName>|<OutputName>`` key
+        :param value: The value to look up
+        :return: A ``list`` of the matching items
+        """
+        return list(self.__index(key).get(value, []))
+
+    def values(self, key):
+        """
+        Returns the distinct values of an indexed key
+
+        :param key: An indexed ``<CollectorName>|<OutputName>`` key
+        :return: A ``list`` of the distinct values
+        """
+        return list(self.__index(key))
+
+    def group_count(self, key, weighted=False):
+        """
+        Returns the count of items for each distinct value of an indexed key
+
+        :param key: An indexed ``<CollectorName>|<OutputName>`` key
+        :param weighted: (optional) If ``True``, the ``count`` of each item
+            (the number of times it was reported) is summed instead of counting
+            the items. Default value: ``False``
+        :return: A ``dictionary`` mapping each distinct value to its count
+        """
+        counts = {}
+        for value, items in self.__index(key).items():
+            if weighted:
+                counts[value] = sum(item[ResultConstants.ITEM_COUNT]
+                                    for item in items)
+            else:
+                counts[value] = len(items)
+        return counts
+
+    def join(self, other, key, other_key=None):
+        """
+        Joins the items of this index with the items of another index whose
+        values for a shared key are equal (for example, the hostname)
+
+        :param other: The other :class:`ResultsIndex`
+        :param key: An indexed ``<CollectorName>|<OutputName>`` key of this
+            index
+        :param other_key: (optional) The indexed key of the `other` index to
+            join on. Defaults to `key`.
+        :return: An iterator over ``(item, other_item)`` tuples
+        """
+        index = self.__index(key)
+        other_index = other.__index(other_key or key)
+        for value, items in index.items():
+            other_items = other_index.get(value)
+            if not other_items:
+                continue
+            for item in items:
+                for other_item in other_items:
+                    yield item, other_item
+
+    def __index(self, key):
+        """
+        Returns the index for a key
+
+        :param key: The ``<CollectorName>|<OutputName>`` key
+        :return: A ``dictionary`` mapping each value to its ``list`` of items
+        """
+        if key not in self.__indexes:
+            raise Exception("Key is not indexed: " + key)
+        return self.__indexes[key]
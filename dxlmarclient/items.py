@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+from .constants import ResultConstants, DataTypeConstants
+from .schema import decode_value
+
+try:
+    from collections.abc import Mapping
+except ImportError:  # pragma: no cover
+    from collections import Mapping  # pylint: disable=deprecated-class
+
+
+class TypedOutput(Mapping):
+    """
+    A read-only view of the ``output`` of a result item whose values are
+    converted to their Python types (see
+    :func:`dxlmarclient.schema.decode_value`) on first access.
+
+    Each value is converted at most once; values that are never read are never
+    converted.
+    """
+
+    def __init__(self, output, schema):
+        """
+        Constructor parameters:
+
+        :param output: The raw ``output`` ``dictionary`` of the result item
+        :param schema: The :class:`dxlmarclient.schema.CollectorSchema` that
+            describes the data types of the outputs
+        """
+        self.__output = output
+        self.__schema = schema
+        self.__decoded = {}
+
+    @property
+    def raw(self):
+        """
+        The raw ``output`` ``dictionary``
+        """
+        return self.__output
+
+    def __getitem__(self, key):
+        try:
+            return self.__decoded[key]
+        except KeyError:
+            value = decode_value(self.__output[key],
+                                 self.__schema.get_key_type(key))
+            self.__decoded[key] = value
+            return value
+
+    def __iter__(self):
+        return iter(self.__output)
+
+    def __len__(self):
+        return len(self.__output)
+
+
+class ResultItem(dict):
+    """
+    A search result item (see
+    :func:`dxlmarclient.results.ResultsContext.get_results`) with lazily typed
+    attribute access.
+
+    The item remains a ``dictionary`` containing the raw values as returned by
+    the MAR server. In addition, the :attr:`output` and :attr:`created_at`
+    attributes provide values converted to their Python types (``int``,
+    ``datetime``, ``ipaddress`` objects, etc.) the first time they are read.
+
+    **Example Usage**
+
+        .. code-block:: python
+
+            results = results_context.get_results(typed=True)
+            for item in results["items"]:
+                # A datetime
+                print item.created_at.year
+                # An ipaddress.IPv4Address or ipaddress.IPv6Address
+                print item.output["HostInfo|ip_address"].is_private
+                # Raw access is unchanged
+                print item["output"]["HostInfo|ip_address"]
+    """
+
+    def __init__(self, item, schema):
+        """
+        Constructor parameters:
+
+        :param item: The raw result item ``dictionary``
+        :param schema: The :class:`dxlmarclient.schema.CollectorSchema` that
+            describes the data types of the outputs
+        """
+        super(ResultItem, self).__init__(item)
+        self.__schema = schema
+        self.__output = None
+        self.__created_at = None
+
+    @property
+    def id(self):  # pylint: disable=invalid-name
+        """
+        The identifier of the item within the search results
+        """
+        return self.get(ResultConstants.ITEM_ID)
+
+    @property
+    def count(self):
+        """
+        The number of times that the search result was reported
+        """
+        return self.get(ResultConstants.ITEM_COUNT)
+
+    @property
+    def created_at(self):
+        """
+        The item timestamp as a ``datetime`` (naive, in UTC)
+        """
+        if self.__created_at is None:
+            self.__created_at = decode_value(
+                self.get(ResultConstants.ITEM_CREATED_AT),
+                DataTypeConstants.DATE)
+        return self.__created_at
+
+    @property
+    def output(self):
+        """
+        A :class:`TypedOutput` view of the item ``output``
+        """
+        if self.__output is None:
+            self.__output = TypedOutput(
+                self.get(ResultConstants.ITEM_OUTPUT, {}), self.__schema)
+        return self.__output
@@ -0,0 +1,190 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+import sqlite3
+import threading
+import time
+
+
+class SearchJournal(object):
+    """
+    A durable record (stored in a SQLite database) of the searches performed by
+    a :class:`dxlmarclient.client.MarClient`: the identifier, canonical query
+    and last known status of each search, and how far its results have been
+    paged.
+
+    If the process performing a search terminates, the search can be resumed
+    via :func:`dxlmarclient.client.MarClient.resume` rather than being run again
+    from scratch.
+
+    **Example Usage**
+
+        .. code-block:: python
+
+            marclient = MarClient(client)
+            marclient.journal = SearchJournal("/var/lib/mar/journal.db")
+
+            # After a restart, continue with the searches that were in progress
+            for entry in marclient.journal.pending():
+                results_context = marclient.resume(entry["searchId"])
+                for item in results_context.iter_results(resume=True):
+                    ...
+    """
+
+    def __init__(self, path):
+        """
+        Constructor parameters:
+
+        :param path: The path of the SQLite database file (created if it does
+            not exist)
+        """
+        self.__lock = threading.Lock()
+        self.__connection = sqlite3.connect(path, check_same_thread=False)
+        with self.__lock:
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS searches ("
+                "search_id TEXT PRIMARY KEY, "
+                "query TEXT NOT NULL, "
+                "status TEXT, "
+                "results INTEGER, "
+                "errors INTEGER, "
+                "hosts INTEGER, "
+                "subscribed_hosts INTEGER, "
+                "paging TEXT, "
+                "paging_offset INTEGER NOT NULL DEFAULT 0, "
+                "paging_complete INTEGER NOT NULL DEFAULT 0, "
+                "created REAL NOT NULL, "
+                "updated REAL NOT NULL)")
+            self.__connection.commit()
+
+    def close(self):
+        """
+        Closes the journal
+        """
+        with self.__lock:
+            self.__connection.close()
+
+    def record_search(self, search_id, query):
+        """
+        Records a newly created search
+
+        :param search_id: The search identifier
+        :param query: The canonical query (see :func:`dxlmarclient.query.canonical_query`)
+        """
+        now = time.time()
+        self.__execute(
+            "INSERT OR REPLACE INTO searches "
+            "(search_id, query, created, updated) VALUES (?, ?, ?, ?)",
+            (search_id, query, now, now))
+
+    def update_status(self, search_id, status, results, errors, hosts,
+                      subscribed_hosts):
+        """
+        Records the last known status of a search
+
+        :param search_id: The search identifier
+        :param status: The status of the search
+        :param results: The count of results
+        :param errors: The count of errors
+        :param hosts: The count of endpoints that responded
+        :param subscribed_hosts: The count of subscribed endpoints
+        """
+        self.__execute(
+            "UPDATE searches SET status = ?, results = ?, errors = ?, "
+            "hosts = ?, subscribed_hosts = ?, updated = ? WHERE search_id = ?",
+            (status, results, errors, hosts, subscribed_hosts, time.time(),
+             search_id))
+
+    def commit_offset(self, search_id, paging, offset, complete=False):
+        """
+        Records the offset up to which the results of a search have been
+        processed
+
+        :param search_id: The search identifier
+        :param paging: A string identifying the filter and sort order used
+            while paging (offsets are only meaningful for the same paging)
+        :param offset: The offset of the first result item not yet processed
+        :param complete: (optional) Whether all of the results have been
+            processed
+        """
+        self.__execute(
+            "UPDATE searches SET paging = ?, paging_offset = ?, "
+            "paging_complete = ?, updated = ? WHERE search_id = ?",
+            (paging, offset, 1 if complete else 0, time.time(), search_id))
+
+    def get(self, search_id):
+        """
+        Returns the journal entry of a search
+
+        :param search_id: The search identifier
+        :return: A ``dictionary`` containing the entry (see :func:`pending`),
+            or ``None`` if the search is not in the journal
+        """
+        entries = self.__query("WHERE search_id = ?", (search_id,))
+        return entries[0] if entries else None
+
+    def find(self, query):
+        """
+        Returns the most recent journal entry of a search with the specified
+        query
+
+        :param query: The canonical query (see :func:`dxlmarclient.query.canonical_query`)
+        :return: A ``dictionary`` containing the entry (see :func:`pending`),
+            or ``None`` if no search with the query is in the journal
+        """
+        entries = self.__query("WHERE query = ? ORDER BY created DESC LIMIT 1",
+                               (query,))
+        return entries[0] if entries else None
+
+    def pending(self):
+        """
+        Returns the entries of the searches whose results have not been fully
+        processed, oldest first.
+
+        Each entry is a ``dictionary`` containing the following fields:
+        ``searchId``, ``query``, ``status``, ``results``, ``errors``,
+        ``hosts``, ``subscribedHosts``, ``paging``, ``pagingOffset``,
+        ``pagingComplete``, ``created`` and ``updated``.
+
+        :return: A ``list`` of entries
+        """
+        return self.__query("WHERE paging_complete = 0 ORDER BY created", ())
+
+    def remove(self, search_id):
+        """
+        Removes a search from the journal
+
+        :param search_id: The search identifier
+        """
+        self.__execute("DELETE FROM searches WHERE search_id = ?",
+                       (search_id,))
+
+    def __execute(self, statement, parameters):
+        with self.__lock:
+            self.__connection.execute(statement, parameters)
+            self.__connection.commit()
+
+    def __query(self, clause, parameters):
+        with self.__lock:
+            rows = self.__connection.execute(
+                "SELECT search_id, query, status, results, errors, hosts, "
+                "subscribed_hosts, paging, paging_offset, paging_complete, "
+                "created, updated FROM searches " + clause,
+                parameters).fetchall()
+        return [{
+            "searchId": row[0],
+            "query": row[1],
+            "status": row[2],
+            "results": row[3],
+            "errors": row[4],
+            "hosts": row[5],
+            "subscribedHosts": row[6],
+            "paging": row[7],
+            "pagingOffset": row[8],
+            "pagingComplete": bool(row[9]),
+            "created": row[10],
+            "updated": row[11]
+        } for row in rows]
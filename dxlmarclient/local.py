@@ -0,0 +1,484 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+import heapq
+import json
+import numbers
+from operator import ge, gt, le, lt
+from .constants import SortConstants, ResultConstants, OperatorConstants
+from ._util import STRING_TYPES, parse_date
+
+
+def _output_key(item):
+    """
+    Returns a key which identifies the ``output`` of a result item (items with
+    identical outputs have identical keys)
+
+    :param item: The result item
+    :return: The key
+    """
+    return json.dumps(item[ResultConstants.ITEM_OUTPUT], sort_keys=True)
+
+
+def _item_value(item, field):
+    """
+    Returns the value of a field of a result item. The field is either one of
+    the item fields (``count``, ``created_at``, etc.) or a
+    ``<CollectorName>|<OutputName>`` key of the item ``output``.
+
+    :param item: The result item
+    :param field: The field name
+    :return: The value (``None`` if the item does not contain the field)
+    """
+    if field in item and field != ResultConstants.ITEM_OUTPUT:
+        return item[field]
+    return item[ResultConstants.ITEM_OUTPUT].get(field)
+
+
+def _sort_value(value):
+    """
+    Returns a value that can be used to sort result values of mixed types
+    (numbers sort before strings)
+
+    :param value: The value (not ``None``)
+    :return: The sortable value
+    """
+    if isinstance(value, numbers.Number):
+        return 0, value
+    if isinstance(value, STRING_TYPES):
+        return 1, value
+    return 1, json.dumps(value, sort_keys=True)
+
+
+def _split_missing(items, sort_by):
+    """
+    Splits result items into those that contain the specified field and those
+    that do not
+
+    :param items: The result items
+    :param sort_by: The field to sort by
+    :return: A ``tuple`` containing a ``list`` of the items that contain the
+        field and a ``list`` of the items that do not
+    """
+    present = []
+    missing = []
+    for item in items:
+        if _item_value(item, sort_by) is None:
+            missing.append(item)
+        else:
+            present.append(item)
+    return present, missing
+
+
+def _sort_items(items, sort_by, sort_direction):
+    """
+    Sorts result items by the specified field. Items that do not contain the
+    field sort last, whatever the sort direction.
+
+    :param items: The result items
+    :param sort_by: The field to sort by
+    :param sort_direction: The sort direction (see :class:`SortConstants`)
+    :return: A sorted ``list`` of the result items
+    """
+    present, missing = _split_missing(items, sort_by)
+    return sorted(present,
+                  key=lambda item: _sort_value(_item_value(item, sort_by)),
+                  reverse=sort_direction == SortConstants.DESC) + missing
+
+
+def _matches_text(item, text_filter):
+    """
+    Returns whether any ``output`` value of a result item contains the
+    specified text (case insensitive)
+
+    :param item: The result item
+    :param text_filter: The text
+    :return: ``True`` if the item matches the text
+    """
+    if not text_filter:
+        return True
+    text_filter = text_filter.lower()
+    for value in item[ResultConstants.ITEM_OUTPUT].values():
+        if value is not None and \
+                text_filter in (value if isinstance(value, STRING_TYPES)
+                                else str(value)).lower():
+            return True
+    return False
+
+
+def _to_number(value):
+    """
+    Converts a value to a number
+
+    :param value: The value
+    :return: The number (``None`` if the value is not numeric)
+    """
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, numbers.Number):
+        return value
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _to_text(value):
+    """
+    Converts a value to lower case text for case insensitive comparisons
+
+    :param value: The value
+    :return: The text
+    """
+    if isinstance(value, bool):
+        value = "true" if value else "false"
+    elif not isinstance(value, STRING_TYPES):
+        value = str(value)
+    return value.lower()
+
+
+def _equals(actual, expected):
+    """
+    Evaluates the ``EQUALS`` operator: numeric values are compared as
+    numbers, other values as case insensitive text
+    """
+    if isinstance(actual, numbers.Number) and not isinstance(actual, bool):
+        return actual == _to_number(expected)
+    return _to_text(actual) == _to_text(expected)
+
+
+# The function used to convert the values compared by each operator (or
+# ``None`` to compare them as is) and the function comparing them
+_COMPARISONS = {
+    OperatorConstants.GREATER_EQUAL_THAN: (_to_number, ge),
+    OperatorConstants.GREATER_THAN: (_to_number, gt),
+    OperatorConstants.LESS_EQUAL_THAN: (_to_number, le),
+    OperatorConstants.LESS_THAN: (_to_number, lt),
+    OperatorConstants.BEFORE: (parse_date, lt),
+    OperatorConstants.AFTER: (parse_date, gt),
+    OperatorConstants.EQUALS: (None, _equals),
+    OperatorConstants.CONTAINS:
+        (_to_text, lambda actual, expected: expected in actual),
+    OperatorConstants.STARTS_WITH:
+        (_to_text, lambda actual, expected: actual.startswith(expected)),
+    OperatorConstants.ENDS_WITH:
+        (_to_text, lambda actual, expected: actual.endswith(expected))
+}
+
+
+def _compare(actual, operator, expected):
+    """
+    Evaluates a MAR condition operator (see :class:`OperatorConstants`)
+    locally
+
+    :param actual: The value of the result item
+    :param operator: The operator
+    :param expected: The value to compare with
+    :return: The result of the comparison
+    """
+    comparison = _COMPARISONS.get(operator)
+    if comparison is None:
+        raise Exception("Unsupported operator: " + str(operator))
+    convert, compare = comparison
+    if convert is not None:
+        actual, expected = convert(actual), convert(expected)
+        if actual is None or expected is None:
+            return False
+    return compare(actual, expected)
+
+
+def where(key, operator, value, negated=False):
+    """
+    Returns a predicate for :class:`LocalResults` that evaluates a MAR
+    condition locally against the ``output`` of each result item.
+
+    Comparisons follow the operators of :class:`OperatorConstants`: string
+    comparisons are case insensitive, numeric operators compare numbers and
+    ``BEFORE``/``AFTER`` compare timestamps. Items that do not contain the
+    output never match.
+
+    **Example Usage**
+
+        .. code-block:: python
+
+            large = where("Files|size", OperatorConstants.GREATER_THAN, 1000000)
+            results = local_results.get_results(predicate=large)
+
+    :param key: The ``<CollectorName>|<OutputName>`` key of the output
+    :param operator: The operator (see :class:`OperatorConstants`)
+    :param value: The value to compare with
+    :param negated: (optional) Whether the comparison is negated
+    :return: A function which receives a result item and returns whether it
+        matches
+    """
+    def predicate(item):
+        actual = item[ResultConstants.ITEM_OUTPUT].get(key)
+        if actual is None:
+            return False
+        return _compare(actual, operator, value) != bool(negated)
+    return predicate
+
+
+def _matches(item, text_filter, predicate):
+    """
+    Returns whether a result item matches a text filter and predicate(s)
+
+    :param item: The result item
+    :param text_filter: The text filter (see :func:`_matches_text`)
+    :param predicate: ``None``, a predicate function or a ``list`` of predicate
+        functions which must all match
+    :return: ``True`` if the item matches
+    """
+    if not _matches_text(item, text_filter):
+        return False
+    if predicate is None:
+        return True
+    if callable(predicate):
+        return predicate(item)
+    return all(pred(item) for pred in predicate)
+
+
+def _results_page(items, offset, limit):
+    """
+    Returns a page of result items in the format returned by
+    :func:`dxlmarclient.results.ResultsContext.get_results`
+
+    :param items: All of the result items
+    :param offset: Index of the first result item of the page
+    :param limit: The maximum count of items in the page
+    :return: A ``dictionary`` containing the page
+    """
+    page = items[offset:offset + limit]
+    return {
+        ResultConstants.START_INDEX: offset,
+        ResultConstants.TOTAL_ITEMS: len(items),
+        ResultConstants.CURRENT_ITEM_COUNT: len(page),
+        ResultConstants.ITEMS_PER_PAGE: limit,
+        ResultConstants.ITEMS: page
+    }
+
+
+class LocalResults(object):
+    """
+    Search results held in memory which can be filtered, sorted and paged
+    without any further requests to the MAR server (see
+    :func:`dxlmarclient.results.ResultsContext.fetch_all`).
+
+    The :func:`get_results` and :func:`iter_results` methods accept the same
+    parameters as those of :class:`dxlmarclient.results.ResultsContext`, and
+    additionally accept `predicates` (see :func:`where`). The result of the
+    last query is kept so that paging through it does not re-sort the items.
+
+    **Example Usage**
+
+        .. code-block:: python
+
+            local_results = results_context.fetch_all()
+
+            # Re-sorting does not involve the MAR server
+            results = local_results.get_results(sort_by="Processes|name",
+                                                sort_direction="asc")
+
+            # The ten largest files
+            largest = local_results.top_n(10, sort_by="Files|size",
+                predicate=where("Files|name", OperatorConstants.ENDS_WITH, ".exe"))
+    """
+
+    def __init__(self, items):
+        """
+        Constructor parameters:
+
+        :param items: The result items
+        """
+        self.__items = list(items)
+        self.__last_query = (None, None)
+
+    @property
+    def has_results(self):
+        """
+        Whether there are results
+        """
+        return len(self.__items) > 0
+
+    @property
+    def result_count(self):
+        """
+        The total count of items available in the results
+        """
+        return len(self.__items)
+
+    def get_results(self, offset=0, limit=20, text_filter="", sort_by="count",
+                    sort_direction=SortConstants.DESC, predicate=None):
+        """
+        Returns a particular set of the results. The parameters and the
+        returned ``dictionary`` are the same as for
+        :func:`dxlmarclient.results.ResultsContext.get_results`.
+
+        :param offset: (optional) Index of the first result item to be returned.
+            Default value: ``0``
+        :param limit: (optional) The maximum number of items to return in the
+            results. Default value: ``20``
+        :param text_filter: (optional) A text based filter to limit the results
+        :param sort_by: (optional) The field that will be used to sort the results.
+            Default value: ``count``
+        :param sort_direction: (optional) values: ascending ``asc`` or
+            descending ``desc`` (String). Default value: ``desc``
+        :param predicate: (optional) A function (or ``list`` of functions) that
+            receives a result item and returns whether it should be included
+            (see :func:`where`)
+        :return: A ``dictionary`` containing the specified results.
+        """
+        return _results_page(
+            self._query(text_filter, sort_by, sort_direction, predicate),
+            offset, limit)
+
+    def iter_results(self, offset=0, page_size=500, text_filter="",
+                     sort_by="count", sort_direction=SortConstants.DESC,
+                     predicate=None):
+        """
+        Returns an iterator over the result items. The parameters are the same
+        as for :func:`get_results` and
+        :func:`dxlmarclient.results.ResultsContext.iter_results`.
+
+        :return: An iterator over the result items
+        """
+        del page_size  # All items are held locally
+        items = self._query(text_filter, sort_by, sort_direction, predicate)
+        for index in range(offset, len(items)):
+            yield items[index]
+
+    def _iter_items(self, offset, page_size):
+        """
+        Returns an iterator over the result items (the counterpart of the
+        internal scans of :class:`dxlmarclient.results.ResultsContext`, which
+        do not commit offsets to the journal)
+        """
+        return self.iter_results(offset, page_size)
+
+    def top_n(self, n, sort_by="count", sort_direction=SortConstants.DESC,
+              text_filter="", predicate=None):
+        """
+        Returns the first `n` matching items in the specified sort order. A
+        heap is used so that the items do not have to be fully sorted. Items
+        that do not contain the `sort_by` field sort last, whatever the sort
+        direction.
+
+        :param n: The count of items to return
+        :param sort_by: (optional) The field that will be used to sort the results.
+            Default value: ``count``
+        :param sort_direction: (optional) values: ascending ``asc`` or
+            descending ``desc`` (String). Default value: ``desc``
+        :param text_filter: (optional) A text based filter to limit the results
+        :param predicate: (optional) A function (or ``list`` of functions) that
+            receives a result item and returns whether it should be included
+        :return: A ``list`` of at most `n` items
+        """
+        select = heapq.nlargest if sort_direction == SortConstants.DESC \
+            else heapq.nsmallest
+        present, missing = _split_missing(
+            (item for item in self.__items
+             if _matches(item, text_filter, predicate)), sort_by)
+        items = select(
+            n, present,
+            key=lambda item: _sort_value(_item_value(item, sort_by)))
+        return items + missing[:max(n - len(items), 0)]
+
+    def _query(self, text_filter, sort_by, sort_direction, predicate=None):
+        """
+        Filters and sorts the items (the result of the last query is kept to
+        make paging through it inexpensive)
+
+        :return: A ``list`` containing the filtered and sorted items
+        """
+        if isinstance(predicate, list):
+            predicate = tuple(predicate)
+        query = (text_filter, sort_by, sort_direction, predicate)
+        last_query, last_items = self.__last_query
+        if query == last_query:
+            return last_items
+        items = _sort_items(
+            [item for item in self.__items
+             if _matches(item, text_filter, predicate)],
+            sort_by, sort_direction)
+        self.__last_query = (query, items)
+        return items
+
+
+class MergedResultsContext(LocalResults):
+    """
+    A single logical view over the results of several MAR searches (see
+    :func:`dxlmarclient.client.MarClient.sharded_search`).
+
+    Items of the individual searches with identical ``output`` values are
+    merged into a single item whose ``count`` is the sum of the counts of the
+    merged items. Filtering, sorting and paging are performed locally over the
+    merged items (see :class:`LocalResults`).
+    """
+
+    def __init__(self, results_contexts, shard_items):
+        """
+        Constructor parameters:
+
+        :param results_contexts: The ``list`` of
+            :class:`dxlmarclient.results.ResultsContext` objects to merge
+        :param shard_items: A ``list`` containing the ``list`` of all result
+            items for each of the `results_contexts`
+        """
+        merged = {}
+        for items in shard_items:
+            for item in items:
+                key = _output_key(item)
+                if key in merged:
+                    merged[key][ResultConstants.ITEM_COUNT] += \
+                        item[ResultConstants.ITEM_COUNT]
+                else:
+                    merged[key] = dict(item)
+        super(MergedResultsContext, self).__init__(merged.values())
+        self.__results_contexts = list(results_contexts)
+
+    @property
+    def results_contexts(self):
+        """
+        The :class:`dxlmarclient.results.ResultsContext` objects that were merged
+        """
+        return list(self.__results_contexts)
+
+    @property
+    def error_count(self):
+        """
+        The count of errors that were reported across the searches
+        """
+        return sum(rc.error_count for rc in self.__results_contexts)
+
+    @property
+    def host_count(self):
+        """
+        The count of endpoints that responded across the searches
+        """
+        return sum(rc.host_count for rc in self.__results_contexts)
+
+    @property
+    def subscribed_host_count(self):
+        """
+        The count of endpoints that were connected to the DXL fabric when the
+        searches started
+        """
+        return sum(rc.subscribed_host_count for rc in self.__results_contexts)
+
+    @property
+    def is_finished(self):
+        """
+        Whether all of the searches have completed
+        """
+        return all(rc.is_finished for rc in self.__results_contexts)
+
+    @property
+    def is_partial(self):
+        """
+        Whether the results are partial (at least one search had not completed
+        when its results were retrieved)
+        """
+        return not self.is_finished
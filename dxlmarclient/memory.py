@@ -0,0 +1,342 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+import itertools
+import threading
+import time
+
+# The process-wide governor (see get_default_governor), held in a list so that
+# it can be replaced without a global statement
+_DEFAULT_GOVERNOR = [None]
+
+# The ticks ordering the use of cached pages (least recently used first)
+_TICKS = itertools.count()
+
+
+def get_default_governor():
+    """
+    Returns the process-wide :class:`MemoryGovernor` used by
+    :class:`dxlmarclient.client.MarClient` objects that do not have their own
+    (see :attr:`dxlmarclient.client.MarClient.memory_governor`)
+
+    :return: The :class:`MemoryGovernor`, or ``None`` (the default) if memory
+        is not limited
+    """
+    return _DEFAULT_GOVERNOR[0]
+
+
+def set_default_governor(governor):
+    """
+    Sets the process-wide :class:`MemoryGovernor` (see
+    :func:`get_default_governor`)
+
+    :param governor: The :class:`MemoryGovernor`, or ``None`` to not limit
+        memory
+    """
+    _DEFAULT_GOVERNOR[0] = governor
+
+
+class _Ledger(object):
+    """
+    The count of bytes held for each key (search identifier or thread) and in
+    total (guarded by the lock of the :class:`MemoryGovernor`)
+    """
+
+    def __init__(self):
+        self.sizes = {}
+        self.total = 0
+
+    def add(self, key, size):
+        """
+        Adjusts the count of bytes held for a key
+        """
+        held = self.sizes.get(key, 0) + size
+        if held > 0:
+            self.sizes[key] = held
+        else:
+            self.sizes.pop(key, None)
+        self.total += size
+
+    def get(self, key):
+        """
+        Returns the count of bytes held for a key
+        """
+        return self.sizes.get(key, 0)
+
+
+class _Cache(_Ledger):
+    """
+    The cached pages, keyed by search identifier and page key, and the count
+    of cached bytes of each search (guarded by the lock of the
+    :class:`MemoryGovernor`)
+    """
+
+    def __init__(self):
+        super(_Cache, self).__init__()
+        self.pages = {}
+
+
+class MemoryGovernor(object):
+    """
+    Limits the memory used by the pages of search results held in a process.
+
+    The governor tracks the size (in bytes, as received from the MAR server)
+    of the pages of results buffered while being iterated (see
+    :func:`dxlmarclient.results.ResultsContext.iter_results`) and of the pages
+    held in its cache (see
+    :attr:`dxlmarclient.results.ResultsContext.cache_priority`). Once the
+    `budget` is reached, iterators wait before retrieving further pages until
+    other pages have been released. Cached pages are evicted, lowest priority
+    and least recently used first, before anything waits.
+
+    A page is always allowed when nothing else is buffered, so a single page
+    larger than the `budget` does not wait forever. A thread that already
+    holds a buffered page (for example, when it retrieves results of another
+    search while iterating over the results of a search) never waits either,
+    as it could otherwise wait for memory that only it can release.
+
+    Pages retrieved via :func:`dxlmarclient.results.ResultsContext.get_results`
+    are accounted for while they are being retrieved and decoded; once
+    returned they belong to the caller and are no longer accounted for
+    (unless they are cached).
+
+    **Example Usage**
+
+        .. code-block:: python
+
+            # Limit all of the MAR clients in the process to 256 MB of pages
+            set_default_governor(MemoryGovernor(256 * 1024 * 1024))
+
+            for item in results_context.iter_results():
+                ...
+
+            print get_default_governor().stats()
+    """
+
+    def __init__(self, budget):
+        """
+        Constructor parameters:
+
+        :param budget: The maximum count of bytes of pages to hold
+        """
+        self.__budget = budget
+        self.__condition = threading.Condition(threading.Lock())
+        # The buffered bytes of each search and of each thread
+        self.__buffered = _Ledger()
+        self.__held = _Ledger()
+        self.__cache = _Cache()
+        self.__waiting = 0
+        self.__page_estimate = 0
+
+    @property
+    def budget(self):
+        """
+        The maximum count of bytes of pages to hold
+        """
+        return self.__budget
+
+    @budget.setter
+    def budget(self, budget):
+        with self.__condition:
+            self.__budget = budget
+            self.__evict(0)
+            self.__condition.notify_all()
+
+    @property
+    def usage(self):
+        """
+        The count of bytes of pages currently held (buffered and cached)
+        """
+        with self.__condition:
+            return self.__buffered.total + self.__cache.total
+
+    def stats(self):
+        """
+        Returns the memory usage
+
+        :return: A ``dictionary`` containing the ``budget``, the ``buffered``
+            and ``cached`` bytes, the count of ``waiting`` threads and a
+            ``searches`` ``dictionary`` mapping each search identifier to a
+            ``dictionary`` with its ``buffered`` and ``cached`` bytes
+        """
+        with self.__condition:
+            searches = {}
+            for search_id, size in self.__buffered.sizes.items():
+                searches.setdefault(search_id, {"buffered": 0, "cached": 0})[
+                    "buffered"] = size
+            for search_id, size in self.__cache.sizes.items():
+                searches.setdefault(search_id, {"buffered": 0, "cached": 0})[
+                    "cached"] = size
+            return {
+                "budget": self.__budget,
+                "buffered": self.__buffered.total,
+                "cached": self.__cache.total,
+                "waiting": self.__waiting,
+                "searches": searches
+            }
+
+    def acquire(self, search_id, size=None, timeout=None):
+        """
+        Accounts for a page buffered for a search by the current thread,
+        first waiting (and evicting cached pages) until the page fits within
+        the `budget` or nothing else is buffered. The current thread does not
+        wait if it already holds a buffered page.
+
+        :param search_id: The search identifier
+        :param size: (optional) The size of the page (in bytes). Defaults to
+            the size of the page last accounted for via :func:`resize`.
+        :param timeout: (optional) The maximum amount of time (in seconds) to
+            wait
+        :return: The size accounted for
+        """
+        deadline = None if timeout is None else time.time() + timeout
+        thread = threading.current_thread()
+        with self.__condition:
+            if size is None:
+                size = self.__page_estimate
+            self.__evict(size)
+            self.__waiting += 1
+            try:
+                while self.__buffered.total and \
+                        not self.__held.get(thread) and \
+                        self.__buffered.total + self.__cache.total + size > \
+                        self.__budget:
+                    remaining = None
+                    if deadline is not None:
+                        remaining = deadline - time.time()
+                        if remaining <= 0:
+                            raise Exception(
+                                "Timed out waiting for memory for search " +
+                                str(search_id))
+                    self.__condition.wait(remaining)
+                    self.__evict(size)
+            finally:
+                self.__waiting -= 1
+            self.__add_buffered(search_id, size)
+            return size
+
+    def resize(self, search_id, size, new_size):
+        """
+        Replaces the size accounted for a page without waiting (for example,
+        once the actual size of a page acquired with an estimated size is
+        known)
+
+        :param search_id: The search identifier
+        :param size: The size that was acquired
+        :param new_size: The actual size
+        """
+        with self.__condition:
+            self.__page_estimate = new_size
+            self.__add_buffered(search_id, new_size - size)
+            if new_size < size:
+                self.__condition.notify_all()
+
+    def release(self, search_id, size):
+        """
+        Releases a page buffered for a search by the current thread
+
+        :param search_id: The search identifier
+        :param size: The size of the page (in bytes)
+        """
+        with self.__condition:
+            self.__add_buffered(search_id, -size)
+            self.__condition.notify_all()
+
+    def cache_put(self, search_id, key, value, size, priority=0):
+        """
+        Adds a page to the cache if it fits within the `budget`, evicting
+        cached pages of lower (or equal) priority if necessary. Never waits.
+
+        :param search_id: The search identifier
+        :param key: The key of the page (unique within the search)
+        :param value: The page
+        :param size: The size of the page (in bytes)
+        :param priority: (optional) The priority of the page. Pages with lower
+            priorities are evicted first. Default value: ``0``
+        :return: ``True`` if the page was cached
+        """
+        with self.__condition:
+            self.__remove_cached((search_id, key))
+            if not self.__evict(size, priority):
+                return False
+            self.__cache.pages[(search_id, key)] = [value, size, priority,
+                                              next(_TICKS)]
+            self.__cache.add(search_id, size)
+            return True
+
+    def cache_get(self, search_id, key):
+        """
+        Returns a cached page
+
+        :param search_id: The search identifier
+        :param key: The key of the page
+        :return: The page, or ``None`` if it is not cached
+        """
+        with self.__condition:
+            entry = self.__cache.pages.get((search_id, key))
+            if entry is None:
+                return None
+            entry[3] = next(_TICKS)
+            return entry[0]
+
+    def cache_discard(self, search_id):
+        """
+        Removes all of the cached pages of a search
+
+        :param search_id: The search identifier
+        """
+        with self.__condition:
+            for cache_key in [cache_key for cache_key in self.__cache.pages
+                              if cache_key[0] == search_id]:
+                self.__remove_cached(cache_key)
+            self.__condition.notify_all()
+
+    def __add_buffered(self, search_id, size):
+        """
+        Adjusts the buffered size of a search and of the current thread (must
+        be called with the lock held)
+        """
+        self.__buffered.add(search_id, size)
+        thread = threading.current_thread()
+        # A page may be released by a thread other than the one that
+        # acquired it (for example, when an abandoned iterator is garbage
+        # collected), which must not leave a negative size for the thread
+        self.__held.add(thread, max(size, -self.__held.get(thread)))
+
+    def __remove_cached(self, cache_key):
+        """
+        Removes a cached page (must be called with the lock held)
+        """
+        entry = self.__cache.pages.pop(cache_key, None)
+        if entry is None:
+            return
+        self.__cache.add(cache_key[0], -entry[1])
+
+    def __evict(self, size, priority=None):
+        """
+        Evicts cached pages, lowest priority and least recently used first,
+        until `size` additional bytes fit within the budget (must be called
+        with the lock held)
+
+        :param size: The count of additional bytes
+        :param priority: (optional) Only evict pages with a priority lower
+            than or equal to this value
+        :return: ``True`` if the additional bytes fit
+        """
+        evicted = False
+        while self.__buffered.total + self.__cache.total + size > \
+                self.__budget:
+            candidates = [(entry[2], entry[3], cache_key)
+                          for cache_key, entry in self.__cache.pages.items()
+                          if priority is None or entry[2] <= priority]
+            if not candidates:
+                break
+            self.__remove_cached(min(candidates)[2])
+            evicted = True
+        if evicted:
+            self.__condition.notify_all()
+        return self.__buffered.total + self.__cache.total + size <= \
+            self.__budget
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+import collections
+import logging
+import threading
+import time
+from dxlclient.message import Message
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+
+class _PooledClient(object):
+    """
+    A DXL client in a :class:`DxlClientPool` and its request counts (guarded
+    by the lock of the pool)
+    """
+
+    def __init__(self, dxl_client):
+        self.dxl_client = dxl_client
+        self.outstanding = 0
+        self.failures = 0
+        self.down_until = 0.0
+
+
+class DxlClientPool(object):
+    """
+    A pool of DXL clients (possibly connected to different brokers) that
+    spreads synchronous requests across the clients.
+
+    Each request is sent via the healthy client with the fewest outstanding
+    requests. A client is considered unhealthy if it is not connected or after
+    `failure_threshold` consecutive requests via the client have failed (for
+    example, due to timeouts); an unhealthy client is retried after
+    `retry_interval` seconds.
+
+    Requests can be given an `affinity` key (the :class:`MarClient` uses the
+    search identifier for the requests that start, poll and stop a search) so
+    that related requests are sent via the same client while it is healthy.
+
+    A pool is created automatically when a ``list`` of DXL clients is passed to
+    :class:`dxlmarclient.client.MarClient`:
+
+        .. code-block:: python
+
+            marclient = MarClient([client1, client2, client3])
+    """
+
+    # The maximum count of affinity keys that are remembered
+    __MAX_AFFINITIES = 10000
+
+    def __init__(self, dxl_clients, failure_threshold=3, retry_interval=30):
+        """
+        Constructor parameters:
+
+        :param dxl_clients: The ``list`` of DXL clients
+        :param failure_threshold: (optional) The count of consecutive failed
+            requests after which a client is considered unhealthy. Default
+            value: ``3``
+        :param retry_interval: (optional) The amount of time (in seconds) after
+            which an unhealthy client is used again. Default value: ``30``
+        """
+        if not dxl_clients:
+            raise Exception("At least one DXL client is required")
+        self.__clients = [_PooledClient(dxl_client)
+                          for dxl_client in dxl_clients]
+        self.__failure_threshold = failure_threshold
+        self.__retry_interval = retry_interval
+        self.__lock = threading.Lock()
+        self.__affinities = collections.OrderedDict()
+        self.__next = 0
+
+    @property
+    def clients(self):
+        """
+        The DXL clients in the pool
+        """
+        return [client.dxl_client for client in self.__clients]
+
+    @property
+    def stats(self):
+        """
+        A ``list`` containing a ``dictionary`` for each client with its count of
+        ``outstanding`` requests, its count of consecutive ``failures`` and
+        whether it is currently ``healthy``
+        """
+        now = time.time()
+        with self.__lock:
+            return [{
+                "outstanding": client.outstanding,
+                "failures": client.failures,
+                "healthy": self.__is_healthy(index, now)
+            } for index, client in enumerate(self.__clients)]
+
+    def sync_request(self, request, timeout=None, affinity=None):
+        """
+        Sends a synchronous request via one of the clients in the pool. Error
+        responses count as failed requests of the client.
+
+        :param request: The request to send
+        :param timeout: (optional) The maximum amount of time (in seconds) to
+            wait for a response
+        :param affinity: (optional) A key identifying related requests that
+            should be sent via the same client
+        :return: The response
+        """
+        index = self.__acquire(affinity)
+        dxl_client = self.__clients[index].dxl_client
+        try:
+            if timeout is None:
+                res = dxl_client.sync_request(request)
+            else:
+                res = dxl_client.sync_request(request, timeout=timeout)
+        except Exception:
+            self.__release(index, False)
+            raise
+        self.__release(index,
+                       res.message_type != Message.MESSAGE_TYPE_ERROR)
+        return res
+
+    def __is_healthy(self, index, now):
+        """
+        Whether a client is healthy (must be called with the lock held)
+        """
+        client = self.__clients[index]
+        if now < client.down_until:
+            return False
+        return getattr(client.dxl_client, "connected", True) is not False
+
+    def __acquire(self, affinity):
+        """
+        Selects the client for a request and increments its outstanding count
+
+        :return: The index of the client
+        """
+        now = time.time()
+        with self.__lock:
+            index = None
+            if affinity is not None:
+                index = self.__affinities.get(affinity)
+                if index is not None and not self.__is_healthy(index, now):
+                    index = None
+            if index is None:
+                count = len(self.__clients)
+                # Fewest outstanding requests, then round robin
+                candidates = [
+                    (self.__clients[i].outstanding, (i - self.__next) % count,
+                     i)
+                    for i in range(count) if self.__is_healthy(i, now)]
+                if not candidates:
+                    # No healthy client, use the one that will recover first
+                    candidates = [(self.__clients[i].down_until, 0, i)
+                                  for i in range(count)]
+                index = min(candidates)[2]
+                self.__next = (index + 1) % count
+            if affinity is not None:
+                # Re-insert to keep the most recently used keys
+                self.__affinities.pop(affinity, None)
+                self.__affinities[affinity] = index
+                if len(self.__affinities) > self.__MAX_AFFINITIES:
+                    self.__affinities.popitem(last=False)
+            self.__clients[index].outstanding += 1
+            return index
+
+    def __release(self, index, succeeded):
+        """
+        Decrements the outstanding count of a client and updates its health
+        """
+        with self.__lock:
+            client = self.__clients[index]
+            client.outstanding -= 1
+            if succeeded:
+                client.failures = 0
+                client.down_until = 0.0
+                return
+            client.failures += 1
+            if client.failures >= self.__failure_threshold:
+                logger.warning("DXL client %d marked unhealthy after %d "
+                               "consecutive failures", index, client.failures)
+                client.down_until = time.time() + self.__retry_interval
@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+import collections
+import json
+import multiprocessing
+from ._util import batches
+
+
+def _encode_batch(items):
+    """
+    Encodes a batch of result items as a single compact JSON string, which is
+    considerably cheaper to transfer to a worker process than pickling each
+    item ``dictionary``
+
+    :param items: The ``list`` of result items
+    :return: The encoded batch
+    """
+    return json.dumps(items, separators=(",", ":"))
+
+
+def _process_batch(func, batch):
+    """
+    Applies a function to each item of an encoded batch (runs in a worker
+    process)
+
+    :param func: The function
+    :param batch: The encoded batch (see :func:`_encode_batch`)
+    :return: A ``list`` containing the value returned by the function for
+        each item
+    """
+    return [func(item) for item in json.loads(batch)]
+
+
+def map_items(func, items, processes=None, batch_size=100, ordered=True,
+              max_pending=None, pool=None):
+    """
+    Applies a CPU-bound function to result items using a pool of worker
+    processes (see :func:`dxlmarclient.results.ResultsContext.map_results`).
+
+    Items are sent to the workers in encoded batches of `batch_size` items. At
+    most `max_pending` batches are outstanding at any time: once that limit is
+    reached no further items are read from `items` (and therefore no further
+    pages of results are retrieved) until a batch has completed.
+
+    :param func: The function to apply to each item. It must be picklable (for
+        example, a function defined at the top level of a module) and receives
+        the raw result item ``dictionary``.
+    :param items: An iterable of result items
+    :param processes: (optional) The count of worker processes. Defaults to the
+        count of CPUs.
+    :param batch_size: (optional) The count of items per batch. Default value:
+        ``100``
+    :param ordered: (optional) Whether the values are returned in the order of
+        the items. If ``False`` the values of each batch are returned as soon
+        as the batch completes. Default value: ``True``
+    :param max_pending: (optional) The maximum count of batches submitted to
+        the workers but not yet returned. Defaults to twice the count of worker
+        processes.
+    :param pool: (optional) An existing ``multiprocessing.Pool`` to use
+        instead of creating (and terminating) a new one
+    :return: An iterator over the values returned by `func`
+    """
+    if batch_size < 1:
+        raise Exception("Batch size must be greater than or equal to 1")
+    processes = processes or multiprocessing.cpu_count()
+    max_pending = max(max_pending or 2 * processes, 1)
+
+    owns_pool = pool is None
+    if owns_pool:
+        pool = multiprocessing.Pool(processes)
+    pending = collections.deque()
+
+    def next_completed():
+        if ordered:
+            return pending.popleft()
+        while True:
+            for result in pending:
+                if result.ready():
+                    pending.remove(result)
+                    return result
+            pending[0].wait(0.05)
+
+    try:
+        for batch in batches(items, batch_size):
+            while len(pending) >= max_pending:
+                for value in next_completed().get():
+                    yield value
+            pending.append(pool.apply_async(
+                _process_batch, (func, _encode_batch(batch))))
+        while pending:
+            for value in next_completed().get():
+                yield value
+    finally:
+        if owns_pool:
+            pool.terminate()
+            pool.join()
@@ -0,0 +1,633 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+import copy
+import json
+from .constants import OperatorConstants, ConditionConstants
+from .constants import ProjectionConstants, DataTypeConstants
+from ._util import STRING_TYPES
+from .schema import DEFAULT_SCHEMA
+
+_OP = OperatorConstants
+_TYPE = DataTypeConstants
+
+#: The operators available for each data type (see
+#: :func:`dxlmarclient.client.MarClient.search`)
+OPERATORS_BY_TYPE = {
+    _TYPE.NUMBER: frozenset([
+        _OP.GREATER_EQUAL_THAN, _OP.GREATER_THAN, _OP.LESS_EQUAL_THAN,
+        _OP.LESS_THAN, _OP.EQUALS]),
+    _TYPE.STRING: frozenset([
+        _OP.EQUALS, _OP.CONTAINS, _OP.STARTS_WITH, _OP.ENDS_WITH]),
+    _TYPE.BOOLEAN: frozenset([_OP.EQUALS]),
+    _TYPE.DATE: frozenset([_OP.EQUALS, _OP.BEFORE, _OP.AFTER]),
+    _TYPE.IPV4IPV6: frozenset([_OP.EQUALS, _OP.CONTAINS]),
+    _TYPE.REG_STR: frozenset([
+        _OP.EQUALS, _OP.CONTAINS, _OP.STARTS_WITH, _OP.ENDS_WITH])
+}
+
+#: The data types for which negated conditions are not supported
+NEGATION_UNSUPPORTED_TYPES = frozenset([_TYPE.REG_STR])
+
+_ALL_OPERATORS = frozenset(
+    op for ops in OPERATORS_BY_TYPE.values() for op in ops)
+_CONDITION_FIELDS = frozenset([
+    ConditionConstants.COND_NAME, ConditionConstants.COND_OUTPUT,
+    ConditionConstants.COND_OP, ConditionConstants.COND_VALUE, "negated"])
+
+
+def canonical_query(projections, conditions=None, context=None):
+    """
+    Returns a canonical JSON representation of a search query (identical
+    queries have identical representations)
+
+    :param projections: A ``list`` containing the `projections` for the search
+    :param conditions: (optional) A ``dictionary`` containing the `conditions` for the search
+    :param context: (optional) A ``dictionary`` containing the `context` for the search
+    :return: The canonical JSON string
+    """
+    return json.dumps({
+        "projections": projections,
+        "condition": conditions or None,
+        "context": context or None
+    }, sort_keys=True, separators=(",", ":"))
+
+
+def search_request(projections, conditions=None, context=None):
+    """
+    Returns the request that creates a search
+
+    :param projections: A ``list`` containing the `projections` for the search
+    :param conditions: (optional) A ``dictionary`` containing the `conditions` for the search
+    :param context: (optional) A ``dictionary`` containing the `context` for the search
+    :return: The request ``dictionary``
+    """
+    body = {"projections": projections}
+    if conditions:
+        body["condition"] = conditions
+    if context:
+        body["context"] = context
+    return {
+        "target": "/v1/simple",
+        "method": "POST",
+        "parameters": {},
+        "body": body
+    }
+
+
+def _is_negated(condition):
+    """
+    Whether a condition is negated (the ``negated`` field may be a ``bool`` or
+    a ``"true"``/``"false"`` string)
+    """
+    negated = condition.get("negated", False)
+    if isinstance(negated, bool):
+        return negated
+    return str(negated).lower() == "true"
+
+
+def _validate_output(schema, collector, output, strict, where):
+    """
+    Validates a collector output against the schema
+
+    :return: The data type of the output (``None`` if unknown)
+    """
+    if not schema.has_collector(collector):
+        if strict:
+            raise ValueError(where + ": unknown collector '" + collector + "'")
+        return None
+    data_type = schema.get_type(collector, output)
+    if data_type is None and strict:
+        raise ValueError(where + ": unknown output '" + str(output) +
+                         "' of collector '" + collector + "'")
+    return data_type
+
+
+def validate_query(projections, conditions=None, context=None,
+                   schema=DEFAULT_SCHEMA, strict=False):
+    """
+    Validates the `projections`, `conditions` and `context` of a search (see
+    :func:`dxlmarclient.client.MarClient.search`) without contacting the MAR
+    server.
+
+    The structure of each part is checked, and each `collector` output is
+    checked against the `schema`: operators must be available for the data
+    type of the output and negation must be supported for it. Collectors and
+    outputs that are not described by the `schema` are accepted (without
+    further checks) unless `strict` is ``True``.
+
+    :param projections: A ``list`` containing the `projections` for the search
+    :param conditions: (optional) A ``dictionary`` containing the `conditions` for the search
+    :param context: (optional) A ``dictionary`` containing the `context` for the search
+    :param schema: (optional) The :class:`dxlmarclient.schema.CollectorSchema`.
+        Default value: :data:`dxlmarclient.schema.DEFAULT_SCHEMA`
+    :param strict: (optional) Whether collectors and outputs that are not
+        described by the `schema` are rejected. Default value: ``False``
+    :raises ValueError: If the query is invalid
+    """
+    _validate_projections(projections, schema, strict)
+    if conditions:
+        _validate_conditions(conditions, schema, strict)
+    if context:
+        _validate_context(context)
+
+
+def _validate_projections(projections, schema, strict):
+    """
+    Validates the `projections` of a search (see :func:`validate_query`)
+    """
+    if not isinstance(projections, list) or not projections:
+        raise ValueError("Projections must be a non-empty list")
+    for index, projection in enumerate(projections):
+        where = "Projection " + str(index)
+        if not isinstance(projection, dict) or \
+                ProjectionConstants.NAME not in projection:
+            raise ValueError(where + ": a collector name is required")
+        collector = projection[ProjectionConstants.NAME]
+        outputs = projection.get(ProjectionConstants.OUTPUTS)
+        if outputs is None:
+            if strict and not schema.has_collector(collector):
+                raise ValueError(where + ": unknown collector '" +
+                                 collector + "'")
+            continue
+        if not isinstance(outputs, list):
+            raise ValueError(where + ": outputs must be a list")
+        for output in outputs:
+            _validate_output(schema, collector, output, strict, where)
+
+
+def _validate_conditions(conditions, schema, strict):
+    """
+    Validates the `conditions` of a search (see :func:`validate_query`)
+    """
+    if not isinstance(conditions, dict) or \
+            list(conditions) != [ConditionConstants.OR] or \
+            not isinstance(conditions[ConditionConstants.OR], list):
+        raise ValueError("Conditions must contain a single 'or' list")
+    for group_index, group in enumerate(conditions[ConditionConstants.OR]):
+        if not isinstance(group, dict) or \
+                list(group) != [ConditionConstants.AND] or \
+                not isinstance(group[ConditionConstants.AND], list) or \
+                not group[ConditionConstants.AND]:
+            raise ValueError("Condition group " + str(group_index) +
+                             ": must contain a single non-empty 'and' list")
+        for index, condition in enumerate(group[ConditionConstants.AND]):
+            _validate_condition(
+                condition, schema, strict,
+                "Condition " + str(group_index) + "." + str(index))
+
+
+def _validate_context(context):
+    """
+    Validates the `context` of a search (see :func:`validate_query`)
+    """
+    if not isinstance(context, dict):
+        raise ValueError("Context must be a dictionary")
+    ma_guids = context.get("maGuids")
+    if ma_guids is None:
+        return
+    if not isinstance(ma_guids, list):
+        raise ValueError("Context 'maGuids' must be a list")
+    for ma_guid in ma_guids:
+        if not isinstance(ma_guid, STRING_TYPES):
+            raise ValueError("Context 'maGuids' must be strings: " +
+                             repr(ma_guid))
+        if ma_guid != ma_guid.lower():
+            raise ValueError("Context 'maGuids' must be lower case: " +
+                             ma_guid)
+
+
+def _validate_condition(condition, schema, strict, where):
+    """
+    Validates a single condition (see :func:`validate_query`)
+    """
+    if not isinstance(condition, dict):
+        raise ValueError(where + ": must be a dictionary")
+    for field in (ConditionConstants.COND_NAME, ConditionConstants.COND_OUTPUT,
+                  ConditionConstants.COND_OP, ConditionConstants.COND_VALUE):
+        if field not in condition:
+            raise ValueError(where + ": '" + field + "' is required")
+    unknown = set(condition) - _CONDITION_FIELDS
+    if unknown:
+        raise ValueError(where + ": unknown field(s) " +
+                         ", ".join(sorted(unknown)))
+    operator = condition[ConditionConstants.COND_OP]
+    if operator not in _ALL_OPERATORS:
+        raise ValueError(where + ": unknown operator '" + str(operator) + "'")
+    data_type = _validate_output(
+        schema, condition[ConditionConstants.COND_NAME],
+        condition[ConditionConstants.COND_OUTPUT], strict, where)
+    if data_type is None:
+        return
+    if operator not in OPERATORS_BY_TYPE[data_type]:
+        raise ValueError(where + ": operator " + operator +
+                         " is not supported for " + data_type + " outputs")
+    if _is_negated(condition) and data_type in NEGATION_UNSUPPORTED_TYPES:
+        raise ValueError(where + ": negation is not supported for " +
+                         data_type + " outputs")
+    if data_type == _TYPE.NUMBER:
+        try:
+            float(condition[ConditionConstants.COND_VALUE])
+        except (TypeError, ValueError):
+            raise ValueError(where + ": value must be numeric")
+
+
+# For each pair of operators, whether a condition with the first operator and
+# value ``a`` implies a condition with the second operator and value ``b``
+_STRING_IMPLICATIONS = {
+    (_OP.EQUALS, _OP.CONTAINS): lambda a, b: b in a,
+    (_OP.EQUALS, _OP.STARTS_WITH): lambda a, b: a.startswith(b),
+    (_OP.EQUALS, _OP.ENDS_WITH): lambda a, b: a.endswith(b),
+    (_OP.STARTS_WITH, _OP.STARTS_WITH): lambda a, b: a.startswith(b),
+    (_OP.STARTS_WITH, _OP.CONTAINS): lambda a, b: b in a,
+    (_OP.ENDS_WITH, _OP.ENDS_WITH): lambda a, b: a.endswith(b),
+    (_OP.ENDS_WITH, _OP.CONTAINS): lambda a, b: b in a,
+    (_OP.CONTAINS, _OP.CONTAINS): lambda a, b: b in a
+}
+_NUMBER_IMPLICATIONS = {
+    (_OP.GREATER_THAN, _OP.GREATER_THAN): lambda a, b: a >= b,
+    (_OP.GREATER_THAN, _OP.GREATER_EQUAL_THAN): lambda a, b: a >= b,
+    (_OP.GREATER_EQUAL_THAN, _OP.GREATER_EQUAL_THAN): lambda a, b: a >= b,
+    (_OP.GREATER_EQUAL_THAN, _OP.GREATER_THAN): lambda a, b: a > b,
+    (_OP.LESS_THAN, _OP.LESS_THAN): lambda a, b: a <= b,
+    (_OP.LESS_THAN, _OP.LESS_EQUAL_THAN): lambda a, b: a <= b,
+    (_OP.LESS_EQUAL_THAN, _OP.LESS_EQUAL_THAN): lambda a, b: a <= b,
+    (_OP.LESS_EQUAL_THAN, _OP.LESS_THAN): lambda a, b: a < b
+}
+# The implications that hold for the outputs of each data type (MAR does not
+# compare IP addresses, for example, as plain strings)
+_IMPLICATIONS = {
+    _TYPE.STRING: _STRING_IMPLICATIONS,
+    _TYPE.NUMBER: _NUMBER_IMPLICATIONS
+}
+
+
+def _normalize_condition(condition):
+    """
+    Returns a copy of a condition with the ``negated`` field normalized (only
+    present, as ``"true"``, for negated conditions)
+    """
+    normalized = dict((field, value) for field, value in condition.items()
+                      if field != "negated")
+    if _is_negated(condition):
+        normalized["negated"] = "true"
+    return normalized
+
+
+def _implies(condition, other, schema):
+    """
+    Whether every item matching a condition also matches another condition
+    of the same output (only established for non-negated conditions of
+    ``STRING`` and ``NUMBER`` outputs of the schema, other than for identical
+    conditions)
+    """
+    if condition == other:
+        return True
+    if "negated" in condition or "negated" in other or \
+            any(condition[field] != other[field] for field in (
+                ConditionConstants.COND_NAME, ConditionConstants.COND_OUTPUT)):
+        return False
+    data_type = schema.get_type(condition[ConditionConstants.COND_NAME],
+                                condition[ConditionConstants.COND_OUTPUT])
+    implication = _IMPLICATIONS.get(data_type, {}).get(
+        (condition[ConditionConstants.COND_OP],
+         other[ConditionConstants.COND_OP]))
+    if implication is None:
+        return False
+    value = condition[ConditionConstants.COND_VALUE]
+    other_value = other[ConditionConstants.COND_VALUE]
+    if data_type == _TYPE.NUMBER:
+        try:
+            return implication(float(value), float(other_value))
+        except (TypeError, ValueError):
+            return False
+    return isinstance(value, STRING_TYPES) and \
+        isinstance(other_value, STRING_TYPES) and \
+        implication(value, other_value)
+
+
+def _remove_redundant(entries, is_redundant):
+    """
+    Removes the entries made redundant by another remaining entry (of two
+    entries that make each other redundant, the later one is kept)
+
+    :param entries: The ``list`` of entries
+    :param is_redundant: A function which receives an entry and another entry
+        and returns whether the entry is redundant given the other one
+    :return: The ``list`` of remaining entries
+    """
+    remaining = list(entries)
+    index = 0
+    while index < len(remaining):
+        entry = remaining[index]
+        if any(is_redundant(entry, other) for other in remaining
+               if other is not entry):
+            del remaining[index]
+        else:
+            index += 1
+    return remaining
+
+
+def _group_implies(group, other_group, schema):
+    """
+    Whether every item matching an ``and`` group of conditions also matches
+    another group (each condition of the other group is implied by a
+    condition of the group)
+    """
+    return all(any(_implies(condition, other, schema) for condition in group)
+               for other in other_group)
+
+
+def optimize_conditions(conditions, schema=DEFAULT_SCHEMA):
+    """
+    Returns equivalent, minimized search `conditions` (see
+    :func:`dxlmarclient.client.MarClient.search`) in a canonical form:
+
+    * Duplicate conditions and conditions implied by another condition of the
+      same ``and`` group (for example, ``name CONTAINS "exe"`` when the group
+      contains ``name EQUALS "csrss.exe"``, or ``size GREATER_THAN 100`` when
+      it contains ``size GREATER_THAN 200``) are removed.
+    * Duplicate ``and`` groups and groups subsumed by a less restrictive group
+      are removed.
+    * The conditions of each group and the groups are sorted, so that equal
+      `conditions` have identical representations regardless of the order in
+      which they were specified.
+
+    Implications between different conditions are only applied to the
+    ``STRING`` and ``NUMBER`` outputs of the `schema` (for the outputs of
+    other data types, or outputs that are not described by the `schema`, only
+    identical conditions are removed).
+
+    `Conditions` which do not have the expected ``or``/``and`` structure are
+    returned unchanged.
+
+    **Example Usage**
+
+        .. code-block:: python
+
+            # {"or": [{"and": [{"name": "Processes", "output": "name",
+            #                   "op": "EQUALS", "value": "csrss.exe"}]}]}
+            conditions = optimize_conditions({
+                "or": [{
+                    "and": [{
+                        "name": "Processes", "output": "name",
+                        "op": "EQUALS", "value": "csrss.exe"
+                    }]
+                }, {
+                    "and": [{
+                        "name": "Processes", "output": "name",
+                        "op": "EQUALS", "value": "csrss.exe"
+                    }, {
+                        "name": "Processes", "output": "name",
+                        "op": "CONTAINS", "value": "exe"
+                    }]
+                }]
+            })
+
+    :param conditions: A ``dictionary`` containing the `conditions` for the search
+    :param schema: (optional) The :class:`dxlmarclient.schema.CollectorSchema`
+        providing the data types of the outputs. Default value:
+        :data:`dxlmarclient.schema.DEFAULT_SCHEMA`
+    :return: The optimized `conditions`
+    """
+    try:
+        groups = [[_normalize_condition(condition)
+                   for condition in group[ConditionConstants.AND]]
+                  for group in conditions[ConditionConstants.OR]]
+    except (AttributeError, KeyError, TypeError):
+        return conditions
+
+    def sort_key(condition):
+        return json.dumps(condition, sort_keys=True)
+
+    optimized = {}
+    for group in groups:
+        unique = dict((sort_key(condition), condition) for condition in group)
+        # Within an "and" group, a condition implied by another condition
+        # does not restrict the matching items any further
+        group = _remove_redundant(
+            [unique[key] for key in sorted(unique)],
+            lambda condition, implying: _implies(implying, condition, schema))
+        optimized[tuple(sort_key(condition) for condition in group)] = group
+    # Within the "or", a group that implies another group only matches items
+    # that the other group matches anyway
+    groups = _remove_redundant(
+        [optimized[key] for key in sorted(optimized, key=lambda k: (len(k), k))],
+        lambda group, other_group: _group_implies(group, other_group, schema))
+    return {ConditionConstants.OR: [{ConditionConstants.AND: group}
+                                    for group in groups]}
+
+
+class CompiledQuery(object):
+    """
+    A validated search query whose request is serialized once, so that it can
+    be executed repeatedly without rebuilding or re-encoding the request (see
+    :func:`QueryBuilder.compile`).
+
+    A compiled query is passed in place of the `projections` to
+    :func:`dxlmarclient.client.MarClient.search` (and the other search
+    methods that accept `projections`, `conditions` and `context`).
+    """
+
+    def __init__(self, projections, conditions=None, context=None):
+        """
+        Constructor parameters:
+
+        :param projections: A ``list`` containing the `projections` for the search
+        :param conditions: (optional) A ``dictionary`` containing the `conditions` for the search
+        :param context: (optional) A ``dictionary`` containing the `context` for the search
+        """
+        self.__projections = copy.deepcopy(projections)
+        self.__conditions = copy.deepcopy(conditions) or None
+        self.__context = copy.deepcopy(context) or None
+        self.__request = search_request(
+            self.__projections, self.__conditions, self.__context)
+        self.__payload = json.dumps(self.__request).encode(encoding="UTF-8")
+        self.__canonical = None
+
+    @property
+    def projections(self):
+        """
+        The `projections` of the query
+        """
+        return copy.deepcopy(self.__projections)
+
+    @property
+    def conditions(self):
+        """
+        The `conditions` of the query (``None`` if there are none)
+        """
+        return copy.deepcopy(self.__conditions)
+
+    @property
+    def context(self):
+        """
+        The `context` of the query (``None`` if there is none)
+        """
+        return copy.deepcopy(self.__context)
+
+    @property
+    def canonical(self):
+        """
+        The canonical JSON representation of the query (see
+        :func:`canonical_query`), computed on first access
+        """
+        if self.__canonical is None:
+            self.__canonical = canonical_query(
+                self.__projections, self.__conditions, self.__context)
+        return self.__canonical
+
+    @property
+    def request(self):
+        """
+        The request that creates the search (must not be modified)
+        """
+        return self.__request
+
+    @property
+    def payload(self):
+        """
+        The encoded request payload that creates the search
+        """
+        return self.__payload
+
+
+class QueryBuilder(object):
+    """
+    Builds search queries using the constants of
+    :class:`dxlmarclient.constants.ProjectionConstants`,
+    :class:`dxlmarclient.constants.ConditionConstants` and
+    :class:`dxlmarclient.constants.OperatorConstants`, and validates them
+    locally against a collector schema (see :func:`validate_query`).
+
+    **Example Usage**
+
+        .. code-block:: python
+
+            # Processes name, id where Processes name equals "csrss" and
+            # Processes name contains "exe" or Processes size not greater
+            # than 200
+            query = QueryBuilder() \\
+                .project("Processes", "name", "id") \\
+                .where("Processes", "name", OperatorConstants.EQUALS, "csrss") \\
+                .where("Processes", "name", OperatorConstants.CONTAINS, "exe") \\
+                .or_where("Processes", "size", OperatorConstants.GREATER_THAN,
+                          "200", negated=True) \\
+                .compile()
+
+            results_context = marclient.search(query)
+    """
+
+    def __init__(self, schema=DEFAULT_SCHEMA, strict=False, optimize=True):
+        """
+        Constructor parameters:
+
+        :param schema: (optional) The :class:`dxlmarclient.schema.CollectorSchema`
+            used for validation. Default value:
+            :data:`dxlmarclient.schema.DEFAULT_SCHEMA`
+        :param strict: (optional) Whether collectors and outputs that are not
+            described by the `schema` are rejected. Default value: ``False``
+        :param optimize: (optional) Whether the conditions are optimized (see
+            :func:`optimize_conditions`). Default value: ``True``
+        """
+        self.__schema = schema
+        self.__strict = strict
+        self.__optimize = optimize
+        self.__projections = []
+        self.__groups = []
+        self.__context = {}
+
+    def project(self, collector, *outputs):
+        """
+        Adds a projection
+
+        :param collector: The collector name
+        :param outputs: The output names of the collector to project (all
+            outputs if none are specified)
+        :return: This builder
+        """
+        projection = {ProjectionConstants.NAME: collector}
+        if outputs:
+            projection[ProjectionConstants.OUTPUTS] = list(outputs)
+        self.__projections.append(projection)
+        return self
+
+    def where(self, collector, output, operator, value, negated=False):
+        """
+        Adds a condition to the current ``and`` group of conditions (starting
+        the first group if necessary)
+
+        :param collector: The collector name
+        :param output: The output name
+        :param operator: The operator (see :class:`OperatorConstants`)
+        :param value: The value to compare with
+        :param negated: (optional) Whether the comparison is negated
+        :return: This builder
+        """
+        if not self.__groups:
+            self.__groups.append([])
+        condition = {
+            ConditionConstants.COND_NAME: collector,
+            ConditionConstants.COND_OUTPUT: output,
+            ConditionConstants.COND_OP: operator,
+            ConditionConstants.COND_VALUE: value
+        }
+        if negated:
+            condition["negated"] = "true"
+        self.__groups[-1].append(condition)
+        return self
+
+    def or_where(self, collector, output, operator, value, negated=False):
+        """
+        Starts a new ``and`` group of conditions (``or``-ed with the previous
+        groups) containing the specified condition
+
+        See :func:`where` for a description of the parameters.
+
+        :return: This builder
+        """
+        self.__groups.append([])
+        return self.where(collector, output, operator, value, negated)
+
+    def context(self, ma_guids):
+        """
+        Restricts the search to the specified Agent UUIDs (MA GUIDs)
+
+        :param ma_guids: A ``list`` of Agent UUIDs (converted to lower case)
+        :return: This builder
+        """
+        self.__context["maGuids"] = [ma_guid.lower() for ma_guid in ma_guids]
+        return self
+
+    def build(self):
+        """
+        Validates and returns the query
+
+        :raises ValueError: If the query is invalid
+        :return: A ``tuple`` containing the `projections`, `conditions` (or
+            ``None``) and `context` (or ``None``)
+        """
+        conditions = None
+        if self.__groups:
+            conditions = {ConditionConstants.OR: [
+                {ConditionConstants.AND: list(group)}
+                for group in self.__groups]}
+        context = dict(self.__context) or None
+        projections = list(self.__projections)
+        validate_query(projections, conditions, context, self.__schema,
+                       self.__strict)
+        if conditions and self.__optimize:
+            conditions = optimize_conditions(conditions, self.__schema)
+        return projections, conditions, context
+
+    def compile(self):
+        """
+        Validates the query and returns it as a :class:`CompiledQuery`
+
+        :raises ValueError: If the query is invalid
+        :return: The :class:`CompiledQuery`
+        """
+        return CompiledQuery(*self.build())
@@ -0,0 +1,860 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+import collections
+import json
+import logging
+import random
+import threading
+from dxlbootstrap.util import MessageUtils
+from .constants import SortConstants, ResultConstants
+from .items import ResultItem
+from .local import LocalResults
+from .processing import map_items
+from .schema import DEFAULT_SCHEMA
+from . import _stream, sampling
+
+# Configure local logger
+logger = logging.getLogger(__name__)
+
+# The status reported by the MAR server once a search has completed
+MAR_SEARCH_STATUS_FINISHED = "FINISHED"
+
+# A snapshot of the status of a search (replaced as a whole when refreshed so
+# that concurrent readers always see consistent counts)
+_SearchStatus = collections.namedtuple(
+    "_SearchStatus", ["result_count", "error_count", "host_count",
+                      "subscribed_host_count", "status"])
+
+
+class _SearchProgress(object):
+    """
+    The status of a MAR search as last reported by the MAR server (the base
+    class of :class:`ResultsContext`).
+
+    The status counts are held as a single snapshot which is replaced as a
+    whole, so readers never observe counts from different status responses.
+    Updates only move the snapshot forward: the counts never decrease and a
+    finished search is never reported as running again, even if status
+    responses retrieved concurrently are applied out of order.
+    """
+
+    def __init__(self, search_id, result_count, error_count, host_count,
+                 subscribed_host_count, status=MAR_SEARCH_STATUS_FINISHED,
+                 timeline=None):
+        self.__search_id = search_id
+        self.__state = _SearchStatus(result_count, error_count, host_count,
+                                     subscribed_host_count, status)
+        self.__timeline = timeline
+        self.__lock = threading.Lock()
+
+    def _update_status(self, body):
+        """
+        Merges the ``body`` of a MAR search status response into the status
+        snapshot (and records it in the timeline, if any)
+
+        :param body: The ``body`` of the status response
+        """
+        if self.__timeline is not None:
+            self.__timeline.record(body)
+        with self.__lock:
+            state = self.__state
+            # A status retrieved concurrently must not revert a finished
+            # search or decrease its counts
+            if state.status == MAR_SEARCH_STATUS_FINISHED:
+                return
+            self.__state = _SearchStatus(
+                max(state.result_count, body["results"]),
+                max(state.error_count, body["errors"]),
+                max(state.host_count, body["hosts"]),
+                max(state.subscribed_host_count, body["subscribedHosts"]),
+                body["status"])
+
+    @property
+    def timeline(self):
+        """
+        The :class:`dxlmarclient.timeline.SearchTimeline` containing the status
+        reported each time the search was polled, or ``None`` if the search
+        was not performed with ``record_timeline=True`` (see
+        :func:`dxlmarclient.client.MarClient.search`)
+        """
+        return self.__timeline
+
+    @property
+    def search_id(self):
+        """
+        The identifier of the search
+        """
+        return self.__search_id
+
+    @property
+    def status(self):
+        """
+        The status of the search as last reported by the MAR server
+        (``FINISHED`` once the search has completed)
+        """
+        return self.__state.status
+
+    @property
+    def is_finished(self):
+        """
+        Whether the search has completed
+        """
+        return self.__state.status == MAR_SEARCH_STATUS_FINISHED
+
+    @property
+    def is_partial(self):
+        """
+        Whether the results are partial, which is the case when the search was
+        returned (see the completion criteria of
+        :func:`dxlmarclient.client.MarClient.search`) or inspected before it
+        completed
+        """
+        return not self.is_finished
+
+    @property
+    def host_coverage(self):
+        """
+        The fraction (``0.0`` to ``1.0``) of subscribed endpoints that have
+        responded to the search so far
+        """
+        state = self.__state
+        if not state.subscribed_host_count:
+            return 0.0
+        return float(state.host_count) / state.subscribed_host_count
+
+    @property
+    def has_results(self):
+        """
+        Whether the search has results
+        """
+        return self.__state.result_count > 0
+
+    @property
+    def result_count(self):
+        """
+        The total count of items available in the search results
+        """
+        return self.__state.result_count
+
+    @property
+    def error_count(self):
+        """
+        The count of errors that were reported during the search
+        """
+        return self.__state.error_count
+
+    @property
+    def host_count(self):
+        """
+        The count of endpoints that responded to the search
+        """
+        return self.__state.host_count
+
+    @property
+    def subscribed_host_count(self):
+        """
+        The count of endpoints that were connected to the DXL fabric when the
+        search started
+        """
+        return self.__state.subscribed_host_count
+
+
+class ResultsContext(_SearchProgress):
+    """
+    This object is used to access to the results of a MAR search (see
+    :func:`dxlmarclient.client.MarClient.search`).
+
+    A results context returned by
+    :func:`dxlmarclient.client.MarClient.start_search` may refer to a search
+    that is still running. In that case the counts reflect the last status
+    retrieved (see :func:`refresh`) and :func:`get_results` returns the
+    results that have been reported so far.
+
+    **Thread Safety**
+
+        A :class:`ResultsContext` can be used by many threads at once. The
+        status counts are replaced as a single snapshot by :func:`refresh`, so
+        readers never observe counts from different status responses. Each
+        call to :func:`get_results` or :func:`iter_results` is independent;
+        an iterator returned by :func:`iter_results` should only be consumed
+        by one thread.
+    """
+
+    def __init__(self, mar_client, search_id, result_count, error_count,
+                 host_count, subscribed_host_count,
+                 status=MAR_SEARCH_STATUS_FINISHED, timeline=None):
+        super(ResultsContext, self).__init__(
+            search_id, result_count, error_count, host_count,
+            subscribed_host_count, status, timeline)
+        self.__mar_client = mar_client
+        self.__search_id = search_id
+        self.__schema = DEFAULT_SCHEMA
+        self.__cache_priority = None
+
+    @classmethod
+    def from_status(cls, mar_client, search_id, status_body, timeline=None):
+        """
+        Creates a results context from the body of a MAR search status response
+
+        :param mar_client: The :class:`dxlmarclient.client.MarClient` that
+            performed the search
+        :param search_id: The search identifier
+        :param status_body: The ``body`` of the status response
+        :param timeline: (optional) The
+            :class:`dxlmarclient.timeline.SearchTimeline` in which the status
+            (and each subsequent status) is recorded
+        :return: A :class:`ResultsContext`
+        """
+        if timeline is not None:
+            timeline.record(status_body)
+        return cls(mar_client, search_id,
+                   status_body["results"], status_body["errors"],
+                   status_body["hosts"], status_body["subscribedHosts"],
+                   status_body["status"], timeline)
+
+    def refresh(self):
+        """
+        Retrieves the current status of the search from the MAR server and
+        updates the counts and status exposed by this object.
+
+        This is only useful for searches which were started via
+        :func:`dxlmarclient.client.MarClient.start_search` and have not yet
+        finished.
+
+        :return: ``True`` if the search has finished, otherwise ``False``
+        """
+        self._update_status(
+            self.__mar_client._get_search_status(self.__search_id))
+        return self.is_finished
+
+    @property
+    def schema(self):
+        """
+        The :class:`dxlmarclient.schema.CollectorSchema` used to convert the
+        output values of typed result items (see :func:`get_results`).
+        Defaults to :data:`dxlmarclient.schema.DEFAULT_SCHEMA`.
+        """
+        return self.__schema
+
+    @schema.setter
+    def schema(self, schema):
+        self.__schema = schema
+
+    @property
+    def cache_priority(self):
+        """
+        The priority with which pages of results retrieved via
+        :func:`get_results`, :func:`top_k` and :func:`sample` are cached by
+        the :attr:`dxlmarclient.client.MarClient.memory_governor` once the
+        search has finished, or ``None`` (the default) to not cache them. When
+        memory is needed, pages with lower priorities are evicted first.
+        """
+        return self.__cache_priority
+
+    @cache_priority.setter
+    def cache_priority(self, cache_priority):
+        self.__cache_priority = cache_priority
+
+    def clear_cache(self):
+        """
+        Removes the cached pages of results of the search (see
+        :attr:`cache_priority`)
+        """
+        governor = self.__mar_client.memory_governor
+        if governor is not None:
+            governor.cache_discard(self.__search_id)
+
+    def get_results(self, offset=0, limit=20, text_filter="", sort_by="count",
+                    sort_direction=SortConstants.DESC, typed=False):
+        """
+        This method is used to retrieve a particular set of results from a MAR search.
+
+        **Results**
+
+            Each search result item has the following fields:
+
+            * ``id``: The identifier of the item within the search results
+            * ``count``: The number of times that the search result was reported
+            * ``created_at``: The item timestamp
+            * ``output``: The search result data where each key is composed of
+              ``<CollectorName>|<OutputName>`` and the value that correspond to
+              that `collector` and `output name`.
+
+            The python ``dictionary`` below is an example of a result that would
+            be returned from the following textual search:
+
+            ``Processes name, id where Processes name equals "csrss" and
+            Processes name contains "exe" or Processes size not greater than
+            200``
+
+            .. code-block:: python
+
+                {
+                    "startIndex": 0,
+                    "totalItems": 2,
+                    "currentItemCount": 2,
+                    "itemsPerPage": 20,
+                    "items": [
+                        {
+                            "id": "{1=[[System Process], 0]}",
+                            "count": 2,
+                            "created_at": "2016-11-16T22:50:04.650Z",
+                            "output": {
+                                "Processes|id": 0,
+                                "Processes|name": "[System Process]"
+                            }
+                        },
+                        {
+                            "id": "{1=[System, 4]}",
+                            "count": 1,
+                            "created_at": "2016-11-16T22:50:04.650Z",
+                            "output": {
+                                "Processes|id": 4,
+                                "Processes|name": "System"
+                            }
+                        }
+                    ]
+                }
+
+        **Example Usage**
+
+            .. code-block:: python
+
+                results = results_context.get_results(sort_by="Processes|name",
+                    sort_direction="asc")
+
+                # Display items
+                for item in results["items"]:
+                    print "    " + item["output"]["Processes|name"]
+
+        **Typed Results**
+
+            If `typed` is ``True`` each item is returned as a
+            :class:`dxlmarclient.items.ResultItem`. The item is still a
+            ``dictionary`` containing the raw values, but its ``output`` and
+            ``created_at`` attributes convert values to ``int``, ``datetime``,
+            ``ipaddress`` objects, etc. (according to the data types in
+            :attr:`schema`) the first time each value is read.
+
+        :param offset: (optional) Index of the first result item to be returned.
+            This value is ``0`` based. Default value: ``0``
+        :param limit: (optional) The maximum number of items to return in the
+            results. Default value: ``20``
+        :param text_filter: (optional) A text based filter to limit the results
+            (this can be any string)
+        :param sort_by: (optional) The field that will be used to sort the results.
+            Default value: ``count``
+        :param sort_direction: (optional) values: ascending ``asc`` or
+            descending ``desc`` (String). Default value: ``desc``
+        :param typed: (optional) Whether to return the items as
+            :class:`dxlmarclient.items.ResultItem` objects. Default value:
+            ``False``
+        :return: A ``dictionary`` containing the specified results from the search.
+        """
+        results = self._get_results_page(offset, limit, text_filter, sort_by,
+                                         sort_direction)[0]
+        if typed and ResultConstants.ITEMS in results:
+            schema = self.__schema
+            results[ResultConstants.ITEMS] = [
+                ResultItem(item, schema)
+                for item in results[ResultConstants.ITEMS]]
+        return results
+
+    def iter_results(self, offset=0, page_size=500, text_filter="",
+                     sort_by="count", sort_direction=SortConstants.DESC,
+                     typed=False, resume=False):
+        """
+        Returns an iterator over the result items of the search starting at
+        the specified `offset`. Results are retrieved from the MAR server one
+        page at a time as the iterator advances, and the items of each page
+        are decoded one at a time as they are reached.
+
+        See :func:`get_results` for a description of the result items and the
+        filtering and sorting parameters.
+
+        **Example Usage**
+
+            .. code-block:: python
+
+                for item in results_context.iter_results(
+                        sort_by="Processes|name", sort_direction="asc"):
+                    print "    " + item["output"]["Processes|name"]
+
+        If the :class:`dxlmarclient.client.MarClient` has a
+        :attr:`dxlmarclient.client.MarClient.journal`, the offset up to which
+        the items have been consumed is committed to the journal after each
+        page, and iteration can be continued from that offset later on (see
+        `resume`).
+
+        If the :class:`dxlmarclient.client.MarClient` has a
+        :attr:`dxlmarclient.client.MarClient.memory_governor`, each page is
+        accounted for until its items have been consumed, and further pages
+        are not retrieved while the memory budget is exceeded.
+
+        :param offset: (optional) Index of the first result item to be returned.
+            This value is ``0`` based. Default value: ``0``
+        :param page_size: (optional) The count of items to retrieve per page.
+            Default value: ``500``
+        :param text_filter: (optional) A text based filter to limit the results
+        :param sort_by: (optional) The field that will be used to sort the results.
+            Default value: ``count``
+        :param sort_direction: (optional) values: ascending ``asc`` or
+            descending ``desc`` (String). Default value: ``desc``
+        :param typed: (optional) Whether to return the items as
+            :class:`dxlmarclient.items.ResultItem` objects. Default value:
+            ``False``
+        :param resume: (optional) Whether to start at the offset last
+            committed to the journal for the same filter and sort order (see
+            :func:`dxlmarclient.client.MarClient.resume`) rather than at
+            `offset`. Default value: ``False``
+        :return: An iterator over the result items
+        """
+        journal = self.__mar_client.journal
+        if resume and journal:
+            entry = journal.get(self.__search_id)
+            if entry and entry["paging"] == json.dumps(
+                    [text_filter, sort_by, sort_direction]):
+                offset = entry["pagingOffset"]
+        return self._iter_items(offset, page_size, text_filter, sort_by,
+                                sort_direction, typed, journal)
+
+    def _iter_items(self, offset, page_size, text_filter="", sort_by="count",
+                    sort_direction=SortConstants.DESC, typed=False,
+                    journal=None):
+        """
+        Returns an iterator over the result items of the search (see
+        :func:`iter_results`)
+
+        :param journal: (optional) The
+            :class:`dxlmarclient.journal.SearchJournal` to commit the offset
+            up to which the items have been consumed to, or ``None`` to not
+            commit it (as for the internal full scans of the results)
+        :return: An iterator over the result items
+        """
+        governor = self.__mar_client.memory_governor
+        held = 0
+        while True:
+            if governor is not None:
+                # Until the size of a page is known, the size of the last page
+                # retrieved (by any search) is the best estimate
+                held = governor.acquire(self.__search_id, held or None)
+            try:
+                results, items, held = self.__stream_governed_page(
+                    governor, held, offset, page_size, text_filter, sort_by,
+                    sort_direction)
+                count = 0
+                for item in items:
+                    count += 1
+                    yield ResultItem(item, self.__schema) if typed else item
+            finally:
+                if governor is not None:
+                    governor.release(self.__search_id, held)
+            offset += count
+            done = count < page_size or \
+                offset >= results.get(ResultConstants.TOTAL_ITEMS, offset)
+            if journal:
+                journal.commit_offset(
+                    self.__search_id,
+                    json.dumps([text_filter, sort_by, sort_direction]),
+                    offset, done and self.is_finished)
+            if done:
+                break
+
+    def __stream_governed_page(self, governor, held, offset, limit,
+                               text_filter, sort_by, sort_direction):
+        """
+        Streams a page of results (see :func:`_stream_results_page`) and
+        replaces the size acquired for it from the memory governor (if any)
+        with its actual size
+
+        :return: A ``tuple`` containing the ``body`` of the results response
+            (without its items), an iterator over its items and the size
+            accounted for by the memory governor
+        """
+        results, items, size = self._stream_results_page(
+            offset, limit, text_filter, sort_by, sort_direction)
+        if governor is None:
+            return results, items, held
+        governor.resize(self.__search_id, held, size)
+        return results, items, size
+
+    def fetch_all(self, page_size=500):
+        """
+        Retrieves all of the result items of the search and returns them as a
+        :class:`dxlmarclient.local.LocalResults` object, which supports
+        filtering, sorting, predicates and top-N queries in memory without any
+        further requests to the MAR server.
+
+        :param page_size: (optional) The count of items to retrieve per page.
+            Default value: ``500``
+        :return: A :class:`dxlmarclient.local.LocalResults` object
+        """
+        return LocalResults(self._iter_items(0, page_size))
+
+    def map_results(self, func, processes=None, batch_size=100, ordered=True,
+                    max_pending=None, page_size=500, text_filter="",
+                    sort_by="count", sort_direction=SortConstants.DESC,
+                    pool=None):
+        """
+        Applies a CPU-bound function (hashing, normalization, classification,
+        etc.) to each result item of the search using a pool of worker
+        processes, so that the work is not limited to a single thread.
+
+        Pages of results are retrieved as they are needed (see
+        :func:`iter_results`) and their items are sent to the workers in
+        batches. Retrieval of further pages pauses while `max_pending` batches
+        are outstanding.
+
+        **Example Usage**
+
+            .. code-block:: python
+
+                # Defined at the top level of a module so it can be pickled
+                def classify(item):
+                    cmdline = item["output"]["Processes|cmdline"]
+                    return item["id"], bool(SUSPICIOUS.search(cmdline))
+
+                for item_id, suspicious in results_context.map_results(
+                        classify, processes=8, ordered=False):
+                    ...
+
+        See :func:`dxlmarclient.processing.map_items` for details of the
+        processing parameters and :func:`get_results` for the filtering and
+        sorting parameters.
+
+        :param func: The function to apply to each raw result item. It must be
+            picklable.
+        :param processes: (optional) The count of worker processes. Defaults to
+            the count of CPUs.
+        :param batch_size: (optional) The count of items per batch. Default
+            value: ``100``
+        :param ordered: (optional) Whether the values are returned in the order
+            of the items. Default value: ``True``
+        :param max_pending: (optional) The maximum count of outstanding batches.
+            Defaults to twice the count of worker processes.
+        :param page_size: (optional) The count of items to retrieve per page.
+            Default value: ``500``
+        :param text_filter: (optional) A text based filter to limit the results
+        :param sort_by: (optional) The field that will be used to sort the results.
+            Default value: ``count``
+        :param sort_direction: (optional) values: ascending ``asc`` or
+            descending ``desc`` (String). Default value: ``desc``
+        :param pool: (optional) An existing ``multiprocessing.Pool`` to use
+        :return: An iterator over the values returned by `func`
+        """
+        return map_items(
+            func,
+            self._iter_items(0, page_size, text_filter, sort_by,
+                             sort_direction),
+            processes=processes, batch_size=batch_size, ordered=ordered,
+            max_pending=max_pending, pool=pool)
+
+    def top_k(self, k, sort_by="count", sort_direction=SortConstants.DESC,
+              predicate=None, text_filter="", page_size=None):
+        """
+        Returns the first `k` result items in the specified sort order that
+        match an optional `predicate`.
+
+        Sorting is performed by the MAR server and pages are retrieved in
+        order until `k` items matching the `predicate` have been found, at
+        which point no further pages are retrieved.
+
+        **Example Usage**
+
+            .. code-block:: python
+
+                top = results_context.top_k(
+                    50, sort_by="Processes|name", sort_direction="asc",
+                    predicate=where("Processes|cmdline",
+                                    OperatorConstants.CONTAINS, "-enc"))
+
+                for item in top["items"]:
+                    print "    " + item["output"]["Processes|name"]
+
+                print "Pages avoided: " + str(top["pagesAvoided"])
+
+        :param k: The count of items to return
+        :param sort_by: (optional) The field that will be used to sort the results.
+            Default value: ``count``
+        :param sort_direction: (optional) values: ascending ``asc`` or
+            descending ``desc`` (String). Default value: ``desc``
+        :param predicate: (optional) A function that receives a result item and
+            returns whether it should be included (see
+            :func:`dxlmarclient.local.where`)
+        :param text_filter: (optional) A text based filter to limit the results
+            (applied by the MAR server)
+        :param page_size: (optional) The count of items to retrieve per page.
+            Defaults to `k` if no `predicate` is specified, otherwise the larger
+            of `k` and ``100``.
+        :return: A ``dictionary`` containing the following fields:
+
+            * ``items``: The ``list`` of at most `k` items
+            * ``pagesFetched``: The count of pages retrieved
+            * ``pagesAvoided``: The count of pages that did not need to be
+              retrieved
+            * ``bytesFetched``: The size (in bytes) of the pages retrieved
+            * ``bytesAvoided``: The estimated size (in bytes) of the pages that
+              did not need to be retrieved (based on the average size of the
+              pages retrieved)
+        """
+        if page_size is None:
+            page_size = k if predicate is None else max(k, 100)
+        page_size = max(page_size, 1)
+
+        items = []
+        sizes = []
+        total_items = 0
+        if k > 0:
+            for results, size in self._iter_results_pages(
+                    page_size, text_filter, sort_by, sort_direction):
+                sizes.append(size)
+                total_items = results.get(ResultConstants.TOTAL_ITEMS, 0)
+                for item in results.get(ResultConstants.ITEMS, []):
+                    if predicate is None or predicate(item):
+                        items.append(item)
+                        if len(items) == k:
+                            break
+                if len(items) == k:
+                    break
+
+        pages_avoided = max(
+            (total_items + page_size - 1) // page_size - len(sizes), 0)
+        return {
+            ResultConstants.ITEMS: items,
+            "pagesFetched": len(sizes),
+            "pagesAvoided": pages_avoided,
+            "bytesFetched": sum(sizes),
+            "bytesAvoided":
+                sum(sizes) * pages_avoided // len(sizes) if sizes else 0
+        }
+
+    def sample(self, n, seed=None, keys=None, page_size=None, text_filter="",
+               sort_by="count", sort_direction=SortConstants.DESC, z=1.96):
+        """
+        Returns a random sample of about `n` result items, retrieved as a few
+        randomly chosen pages of results rather than the full set, together
+        with the estimated frequency of each output value among all of the
+        result items.
+
+        The estimates are based on every item of the sampled pages and include
+        margins of error (see
+        :func:`dxlmarclient.sampling.estimate_frequencies`). Items which are
+        adjacent in the sort order are sampled together, so smaller pages
+        yield a more uniform sample at the cost of more requests. If the
+        search has no more than `n` result items, all of them are retrieved
+        and the estimates are exact.
+
+        **Example Usage**
+
+            .. code-block:: python
+
+                sample = results_context.sample(1000, seed=1,
+                                                keys=["Processes|name"])
+                names = sample["frequencies"]["Processes|name"]
+                for name, frequency in names.items():
+                    print name + ": " + str(frequency["estimate"]) + \\
+                        " +/- " + str(frequency["estimateMargin"])
+
+        :param n: The requested count of sampled items
+        :param seed: (optional) The seed used to choose the pages, to make the
+            sample reproducible
+        :param keys: (optional) The ``<CollectorName>|<OutputName>`` keys of
+            the outputs for which to estimate frequencies. Defaults to all of
+            the outputs of the sampled items.
+        :param page_size: (optional) The count of items per page. Defaults to
+            a tenth of `n` (at least ``1`` and at most ``500``), so that about
+            ten pages are retrieved.
+        :param text_filter: (optional) A text based filter to limit the results
+            (applied by the MAR server)
+        :param sort_by: (optional) The field that will be used to sort the results.
+            Default value: ``count``
+        :param sort_direction: (optional) values: ascending ``asc`` or
+            descending ``desc`` (String). Default value: ``desc``
+        :param z: (optional) The z-score of the confidence level of the margins
+            of error. Default value: ``1.96`` (95%)
+        :return: A ``dictionary`` containing the following fields:
+
+            * ``items``: The ``list`` of at most `n` sampled items
+            * ``totalItems``: The total count of result items
+            * ``sampledItems``: The count of items retrieved
+            * ``pagesFetched``: The count of pages retrieved
+            * ``bytesFetched``: The size (in bytes) of the pages retrieved
+            * ``frequencies``: The estimated frequencies (see
+              :func:`dxlmarclient.sampling.estimate_frequencies`)
+        """
+        if n < 1:
+            raise Exception("Sample size must be greater than or equal to 1")
+        if page_size is None:
+            page_size = min(max(n // 10, 1), 500)
+        rng = random.Random(seed)
+
+        pages, total_items, total_pages, sizes = self._sample_pages(
+            n, rng, page_size, text_filter, sort_by, sort_direction)
+        items = [item for page in pages for item in page]
+        if keys is None:
+            keys = sorted(set(key for item in items
+                              for key in item[ResultConstants.ITEM_OUTPUT]))
+        return {
+            ResultConstants.ITEMS:
+                rng.sample(items, n) if len(items) > n else items,
+            ResultConstants.TOTAL_ITEMS: total_items,
+            "sampledItems": len(items),
+            "pagesFetched": len(sizes),
+            "bytesFetched": sum(sizes),
+            "frequencies": sampling.estimate_frequencies(
+                pages, total_items, total_pages, keys, z) if items else {}
+        }
+
+    def _sample_pages(self, n, rng, page_size, text_filter, sort_by,
+                      sort_direction):
+        """
+        Retrieves randomly chosen pages of results for a sample (see
+        :func:`sample`)
+
+        :return: A ``tuple`` containing the ``list`` of items of each sampled
+            page, the total count of result items, the total count of pages
+            and a ``list`` of the size (in bytes) of each page retrieved
+        """
+        sizes = []
+        if text_filter:
+            # The count of items matching the filter is only known from a page
+            results, size = self._get_results_page(
+                0, 1, text_filter, sort_by, sort_direction)
+            sizes.append(size)
+            total_items = results.get(ResultConstants.TOTAL_ITEMS, 0)
+        else:
+            total_items = self.result_count
+
+        pages = []
+        total_pages = 0
+        if total_items:
+            offsets, total_pages = sampling.choose_pages(
+                total_items, page_size, n, rng)
+            for offset in offsets:
+                results, size = self._get_results_page(
+                    offset, page_size, text_filter, sort_by, sort_direction)
+                sizes.append(size)
+                pages.append(results.get(ResultConstants.ITEMS, []))
+        return pages, total_items, total_pages, sizes
+
+    def _iter_results_pages(self, page_size, text_filter, sort_by,
+                            sort_direction):
+        """
+        Retrieves the pages of results in order (see :func:`_get_results_page`)
+        until the last page has been retrieved
+
+        :return: A generator of ``tuples`` containing the ``body`` of each
+            results response and the size (in bytes) of its payload
+        """
+        offset = 0
+        while True:
+            results, size = self._get_results_page(
+                offset, page_size, text_filter, sort_by, sort_direction)
+            yield results, size
+            page = results.get(ResultConstants.ITEMS, [])
+            offset += len(page)
+            if len(page) < page_size or \
+                    offset >= results.get(ResultConstants.TOTAL_ITEMS, 0):
+                return
+
+    def _get_results_page(self, offset, limit, text_filter, sort_by,
+                          sort_direction):
+        """
+        Retrieves a page of results from the MAR server
+
+        If the :attr:`dxlmarclient.client.MarClient.memory_governor` has
+        exceeded its budget, the page is not retrieved until memory has been
+        released, and the page is accounted for until it has been decoded.
+        Pages of finished searches are cached according to
+        :attr:`cache_priority`.
+
+        :return: A ``tuple`` containing the ``body`` of the results response
+            and the size (in bytes) of the response payload
+        """
+        governor = self.__mar_client.memory_governor
+        if governor is None:
+            body, items, size = self._stream_results_page(
+                offset, limit, text_filter, sort_by, sort_direction)
+            body[ResultConstants.ITEMS] = list(items)
+            return body, size
+
+        cache_priority = self.__cache_priority
+        cache_key = None
+        if cache_priority is not None and self.is_finished:
+            cache_key = json.dumps([offset, limit, text_filter, sort_by,
+                                    sort_direction])
+            page = governor.cache_get(self.__search_id, cache_key)
+            if page is not None:
+                body, items, size = page
+                body = dict(body)
+                body[ResultConstants.ITEMS] = list(items)
+                return body, size
+
+        # The page is accounted for (waiting while the budget is exceeded)
+        # until it has been decoded and handed over to the caller or cached
+        held = governor.acquire(self.__search_id)
+        try:
+            body, items, held = self.__stream_governed_page(
+                governor, held, offset, limit, text_filter, sort_by,
+                sort_direction)
+            items = list(items)
+        finally:
+            governor.release(self.__search_id, held)
+        size = held
+        if cache_key is not None:
+            governor.cache_put(self.__search_id, cache_key,
+                               (dict(body), items, size), size,
+                               cache_priority)
+        body[ResultConstants.ITEMS] = list(items)
+        return body, size
+
+    def _stream_results_page(self, offset, limit, text_filter, sort_by,
+                             sort_direction):
+        """
+        Retrieves a page of results from the MAR server. The result items are
+        decoded one at a time from the response payload as they are iterated,
+        rather than decoding the whole response up front.
+
+        :return: A ``tuple`` containing the ``body`` of the results response
+            (without its ``items``), an iterator over the result items and the
+            size (in bytes) of the response payload
+        """
+        res = self.__mar_client._send_mar_search_request({
+            "target": "/v1/" + self.__search_id + "/results",
+            "method": "GET",
+            "parameters": {
+                "$offset": offset,
+                "$limit": limit,
+                "filter": text_filter,
+                "sortBy": sort_by,
+                "sortDirection": sort_direction
+            },
+            "body": {}
+        })
+        text = MessageUtils.decode_payload(res).rstrip("\0")
+        members = _stream.object_members(text, 0)
+
+        code = _stream.decode_value(text, members["code"]) \
+            if "code" in members else None
+        if code is None or code < 200 or code >= 300:
+            # Decode the full response to report the failure
+            self.__mar_client._process_mar_search_response(res)
+
+        if "body" not in members:
+            raise Exception("Unable to find 'body' in search result.")
+
+        body = {}
+        items = iter(())
+        for key, index in _stream.object_members(text,
+                                                 members["body"]).items():
+            if key == ResultConstants.ITEMS:
+                items = _stream.iter_array(text, index)
+            else:
+                body[key] = _stream.decode_value(text, index)
+
+        logger.debug("Response: code=%s, body=%s", code, body)
+        return body, items, len(res.payload)
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+import math
+from .constants import ResultConstants
+
+
+def choose_pages(total_items, page_size, sample_size, rng):
+    """
+    Chooses the pages of results to retrieve for a sample (see
+    :func:`dxlmarclient.results.ResultsContext.sample`)
+
+    :param total_items: The total count of result items
+    :param page_size: The count of items per page
+    :param sample_size: The requested count of sampled items
+    :param rng: The ``random.Random`` used to choose the pages
+    :return: A ``tuple`` containing the sorted ``list`` of page offsets and
+        the total count of pages
+    """
+    total_pages = (total_items + page_size - 1) // page_size
+    count = min((sample_size + page_size - 1) // page_size, total_pages)
+    pages = sorted(rng.sample(range(total_pages), count))
+    return [page * page_size for page in pages], total_pages
+
+
+def estimate_frequencies(pages, total_items, total_pages, keys, z=1.96):
+    """
+    Estimates the frequency of each output value among all of the result items
+    of a search from a random sample of its pages.
+
+    The pages are treated as a cluster sample: the fraction of items with each
+    value is estimated by the ratio of matching items to sampled items, and
+    its margin of error from the variance of that ratio between pages (with a
+    finite population correction). If a single page was sampled, the items are
+    treated as a simple random sample instead.
+
+    :param pages: A ``list`` containing the ``list`` of items of each sampled
+        page
+    :param total_items: The total count of result items
+    :param total_pages: The total count of pages
+    :param keys: The ``<CollectorName>|<OutputName>`` keys of the outputs for
+        which to estimate frequencies
+    :param z: (optional) The z-score of the confidence level of the margins of
+        error. Default value: ``1.96`` (95%)
+    :return: A ``dictionary`` mapping each key to a ``dictionary`` mapping each
+        sampled value to a ``dictionary`` with the following fields: ``count``
+        (the count of sampled items with the value), ``fraction`` (the
+        estimated fraction of all items), ``fractionMargin``, ``estimate``
+        (the estimated count of all items) and ``estimateMargin``
+    """
+    sizes = [len(page) for page in pages]
+    sampled = sum(sizes)
+    frequencies = {}
+    for key in keys:
+        page_counts = [_value_counts(page, key) for page in pages]
+        estimates = {}
+        for value in set(value for counts in page_counts for value in counts):
+            matches = [counts.get(value, 0) for counts in page_counts]
+            fraction = float(sum(matches)) / sampled
+            margin = _fraction_margin(matches, sizes, fraction, total_items,
+                                      total_pages, z)
+            estimates[value] = {
+                "count": sum(matches),
+                "fraction": fraction,
+                "fractionMargin": margin,
+                "estimate": fraction * total_items,
+                "estimateMargin": margin * total_items
+            }
+        frequencies[key] = estimates
+    return frequencies
+
+
+def _value_counts(page, key):
+    """
+    Counts the items of a page with each value of an output
+
+    :param page: The ``list`` of items of the page
+    :param key: The ``<CollectorName>|<OutputName>`` key of the output
+    :return: A ``dictionary`` mapping each value to its count of items
+    """
+    counts = {}
+    for item in page:
+        value = item[ResultConstants.ITEM_OUTPUT].get(key)
+        counts[value] = counts.get(value, 0) + 1
+    return counts
+
+
+def _fraction_margin(matches, sizes, fraction, total_items, total_pages, z):
+    """
+    Returns the margin of error of the estimated fraction of items with a
+    value (see :func:`estimate_frequencies`)
+
+    :param matches: The count of items with the value in each sampled page
+    :param sizes: The count of items in each sampled page
+    :param fraction: The fraction of sampled items with the value
+    :param total_items: The total count of result items
+    :param total_pages: The total count of pages
+    :param z: The z-score of the confidence level
+    :return: The margin of error
+    """
+    page_count = len(sizes)
+    sampled = sum(sizes)
+    if page_count >= total_pages:
+        return 0.0
+    if page_count > 1:
+        mean_size = float(sampled) / page_count
+        variance = sum((match - fraction * size) ** 2
+                       for match, size in zip(matches, sizes)) / \
+            (page_count - 1)
+        return z * math.sqrt(
+            (1.0 - float(page_count) / total_pages) * variance /
+            page_count) / mean_size
+    return z * math.sqrt(
+        max(1.0 - float(sampled) / total_items, 0.0) *
+        fraction * (1.0 - fraction) / sampled)
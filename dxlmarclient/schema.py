@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+import numbers
+from .constants import DataTypeConstants
+from ._util import parse_date, to_text
+
+try:
+    import ipaddress
+except ImportError:  # pragma: no cover
+    ipaddress = None
+
+_N = DataTypeConstants.NUMBER
+_S = DataTypeConstants.STRING
+_D = DataTypeConstants.DATE
+_IP = DataTypeConstants.IPV4IPV6
+_R = DataTypeConstants.REG_STR
+
+# The output data types of the collectors bundled with McAfee Active Response
+_DEFAULT_COLLECTORS = {
+    "HostInfo": {
+        "hostname": _S, "ip_address": _IP, "os": _S,
+        "connection_status": _S, "platform": _S
+    },
+    "Processes": {
+        "name": _S, "id": _N, "threadcount": _N, "parentname": _S,
+        "size": _N, "md5": _S, "sha1": _S, "sha256": _S, "cmdline": _S,
+        "imagepath": _S, "parentimagepath": _S, "kerneltime": _N,
+        "usertime": _N, "uptime": _N, "user": _S, "user_id": _S
+    },
+    "Files": {
+        "name": _S, "dir": _S, "full_name": _S, "size": _N, "sha1": _S,
+        "md5": _S, "sha256": _S, "created_at": _D, "deleted_at": _D,
+        "last_write": _D, "status": _S
+    },
+    "NetworkFlow": {
+        "time": _D, "direction": _S, "src_ip": _IP, "src_port": _N,
+        "dst_ip": _IP, "dst_port": _N, "proto": _S, "ip_class": _N,
+        "seq_number": _N, "src_mac": _S, "dst_mac": _S, "process": _S,
+        "process_id": _N, "md5": _S, "sha1": _S, "user": _S, "user_id": _S,
+        "twin_flow_info": _S
+    },
+    "CurrentFlow": {
+        "local_ip": _IP, "local_port": _N, "remote_ip": _IP,
+        "remote_port": _N, "status": _S, "process_id": _N, "user": _S,
+        "user_id": _S, "proto": _S, "md5": _S, "sha1": _S
+    },
+    "DNSCache": {
+        "hostname": _S, "ipaddress": _IP
+    },
+    "Services": {
+        "name": _S, "description": _S, "status": _S, "startuptype": _S,
+        "user": _S
+    },
+    "Software": {
+        "displayname": _S, "displayversion": _S, "publisher": _S,
+        "installdate": _S
+    },
+    "WinRegistry": {
+        "keypath": _R, "keyvalue": _R, "valuedata": _S, "valuetype": _S
+    },
+    "UsbConnectedStorageDevices": {
+        "vendor_id": _S, "product_id": _S, "serial_number": _S,
+        "device_type": _S, "guid": _S, "last_connection_time": _D,
+        "last_time_used_by_user": _D, "user_name": _S
+    },
+    "LoggedInUsers": {
+        "username": _S, "userdomain": _S
+    }
+}
+
+
+def _decode_number(value):
+    if isinstance(value, numbers.Number):
+        return value
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return float(value)
+
+
+def _decode_boolean(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value).lower()
+    if text not in ("true", "false"):
+        raise ValueError("Not a boolean: " + text)
+    return text == "true"
+
+
+def _decode_date(value):
+    decoded = parse_date(value)
+    if decoded is None:
+        raise ValueError("Not a date")
+    return decoded
+
+
+def _decode_ip_address(value):
+    return ipaddress.ip_address(to_text(value))
+
+
+# The function converting raw values of each data type (raising TypeError or
+# ValueError for values that cannot be converted)
+_DECODERS = {
+    DataTypeConstants.NUMBER: _decode_number,
+    DataTypeConstants.BOOLEAN: _decode_boolean,
+    DataTypeConstants.DATE: _decode_date
+}
+if ipaddress:
+    _DECODERS[DataTypeConstants.IPV4IPV6] = _decode_ip_address
+
+
+def decode_value(value, data_type):
+    """
+    Converts a raw result value to the Python type corresponding to its data
+    type (see :class:`dxlmarclient.constants.DataTypeConstants`):
+
+    * ``NUMBER``: ``int`` or ``float``
+    * ``BOOLEAN``: ``bool``
+    * ``DATE``: ``datetime`` (naive, in UTC)
+    * ``IPV4IPV6``: ``ipaddress.IPv4Address`` or ``ipaddress.IPv6Address``
+
+    Values of other types, and values that cannot be converted, are returned
+    unchanged.
+
+    :param value: The raw value
+    :param data_type: The data type (``None`` if unknown)
+    :return: The converted value
+    """
+    decoder = _DECODERS.get(data_type)
+    if value is None or decoder is None:
+        return value
+    try:
+        return decoder(value)
+    except (TypeError, ValueError):
+        return value
+
+
+class CollectorSchema(object):
+    """
+    Describes the data types (see
+    :class:`dxlmarclient.constants.DataTypeConstants`) of the outputs of MAR
+    `collectors`.
+
+    :data:`DEFAULT_SCHEMA` describes the collectors bundled with McAfee Active
+    Response. Custom collectors can be described by creating a schema that
+    extends it:
+
+        .. code-block:: python
+
+            schema = DEFAULT_SCHEMA.extend({
+                "MyCollector": {
+                    "name": DataTypeConstants.STRING,
+                    "size": DataTypeConstants.NUMBER
+                }
+            })
+    """
+
+    def __init__(self, collectors):
+        """
+        Constructor parameters:
+
+        :param collectors: A ``dictionary`` mapping each collector name to a
+            ``dictionary`` of its output names and their data types
+        """
+        self.__collectors = {}
+        for collector, outputs in collectors.items():
+            self.__collectors[collector] = dict(outputs)
+
+    @property
+    def collectors(self):
+        """
+        The names of the collectors described by the schema
+        """
+        return list(self.__collectors)
+
+    def extend(self, collectors):
+        """
+        Returns a new schema that also describes the specified collectors
+        (replacing the description of collectors with the same name)
+
+        :param collectors: A ``dictionary`` mapping each collector name to a
+            ``dictionary`` of its output names and their data types
+        :return: The new :class:`CollectorSchema`
+        """
+        merged = dict(self.__collectors)
+        merged.update(collectors)
+        return CollectorSchema(merged)
+
+    def has_collector(self, collector):
+        """
+        Whether the schema describes a collector
+
+        :param collector: The collector name
+        :return: ``True`` if the collector is described by the schema
+        """
+        return collector in self.__collectors
+
+    def get_outputs(self, collector):
+        """
+        Returns the outputs of a collector and their data types
+
+        :param collector: The collector name
+        :return: A ``dictionary`` mapping each output name to its data type
+            (``None`` if the collector is not described by the schema)
+        """
+        outputs = self.__collectors.get(collector)
+        return None if outputs is None else dict(outputs)
+
+    def get_type(self, collector, output):
+        """
+        Returns the data type of a collector output
+
+        :param collector: The collector name
+        :param output: The output name
+        :return: The data type (``None`` if the output is not described by the
+            schema)
+        """
+        return self.__collectors.get(collector, {}).get(output)
+
+    def get_key_type(self, key):
+        """
+        Returns the data type of a ``<CollectorName>|<OutputName>`` result key
+
+        :param key: The result key
+        :return: The data type (``None`` if the output is not described by the
+            schema)
+        """
+        collector, _, output = key.partition("|")
+        return self.get_type(collector, output)
+
+
+#: The schema of the collectors bundled with McAfee Active Response
+DEFAULT_SCHEMA = CollectorSchema(_DEFAULT_COLLECTORS)
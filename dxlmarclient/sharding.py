@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+from concurrent.futures import ThreadPoolExecutor
+from .constants import ResultConstants
+from .local import MergedResultsContext
+from ._util import batches
+
+
+def search_all_items(mar_client, projections, conditions, context, page_size,
+                     timeout):
+    """
+    Executes a search and retrieves all of its result items
+
+    :return: A ``tuple`` containing the
+        :class:`dxlmarclient.results.ResultsContext` and a ``list`` of all of
+        the result items
+    """
+    results_context = mar_client.search(projections, conditions, context,
+                                        timeout=timeout)
+    return results_context, list(results_context._iter_items(0, page_size))
+
+
+def _merge(searches):
+    """
+    Merges the results of searches
+
+    :param searches: A ``list`` of ``tuples`` returned by
+        :func:`search_all_items`
+    :return: A :class:`dxlmarclient.local.MergedResultsContext`
+    """
+    return MergedResultsContext([search[0] for search in searches],
+                                [search[1] for search in searches])
+
+
+def _distinct_guids(source, extract_guid, page_size):
+    """
+    Pages the results of a search and yields the distinct Agent UUIDs (MA
+    GUIDs) of its items as they are found
+
+    :param source: The :class:`dxlmarclient.results.ResultsContext` (or
+        :class:`dxlmarclient.local.MergedResultsContext`) of the search
+    :param extract_guid: A function which receives a result item and returns
+        the Agent UUID (or ``None`` to skip the item)
+    :param page_size: The count of items to retrieve per page of results
+    :return: A generator of lower case GUIDs
+    """
+    seen = set()
+    for item in source._iter_items(0, page_size):
+        ma_guid = extract_guid(item)
+        if not ma_guid:
+            continue
+        ma_guid = str(ma_guid).lower()
+        if ma_guid not in seen:
+            seen.add(ma_guid)
+            yield ma_guid
+
+
+def sharded_search(mar_client, projections, conditions=None, context=None,
+                   shard_size=1000, max_concurrency=4, page_size=500,
+                   timeout=None):
+    """
+    Executes a search per shard of the ``maGuids`` of the `context` (see
+    :func:`dxlmarclient.client.MarClient.sharded_search`)
+
+    :param mar_client: The :class:`dxlmarclient.client.MarClient`
+    :param projections: A ``list`` containing the `projections` for the search
+    :param conditions: (optional) A ``dictionary`` containing the `conditions`
+        for the search
+    :param context: A ``dictionary`` containing the `context` for the search,
+        including the ``maGuids`` to shard
+    :param shard_size: (optional) The maximum count of GUIDs per search.
+        Default value: ``1000``
+    :param max_concurrency: (optional) The maximum count of searches to run at
+        the same time. Default value: ``4``
+    :param page_size: (optional) The count of items to retrieve per page of
+        results. Default value: ``500``
+    :param timeout: (optional) The maximum amount of time (in seconds) to wait
+        for each shard search to finish
+    :return: A :class:`dxlmarclient.local.MergedResultsContext`
+    """
+    if not context or not context.get("maGuids"):
+        raise Exception("Sharded searches require 'maGuids' in the context")
+    if shard_size < 1:
+        raise Exception("Shard size must be greater than or equal to 1")
+
+    ma_guids = context["maGuids"]
+    shard_contexts = []
+    for index in range(0, len(ma_guids), shard_size):
+        shard_context = dict(context)
+        shard_context["maGuids"] = ma_guids[index:index + shard_size]
+        shard_contexts.append(shard_context)
+
+    def run_shard(shard_context):
+        return search_all_items(mar_client, projections, conditions,
+                                shard_context, page_size, timeout)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        return _merge(list(executor.map(run_shard, shard_contexts)))
+
+
+def pivot(mar_client, source, projections, guid_key, conditions=None,
+          context=None, batch_size=500, max_concurrency=4, page_size=500,
+          timeout=None):
+    """
+    Executes follow-up searches scoped to the hosts that reported results in a
+    previous search (see :func:`dxlmarclient.client.MarClient.pivot`)
+
+    :param mar_client: The :class:`dxlmarclient.client.MarClient`
+    :param source: The :class:`dxlmarclient.results.ResultsContext` (or
+        :class:`dxlmarclient.local.MergedResultsContext`) of the previous
+        search
+    :param projections: A ``list`` containing the `projections` for the
+        follow-up search
+    :param guid_key: The ``<CollectorName>|<OutputName>`` key of the output
+        that contains the Agent UUID of the host that reported each item, or a
+        function which receives a result item and returns the Agent UUID
+    :param conditions: (optional) A ``dictionary`` containing the `conditions`
+        for the follow-up search
+    :param context: (optional) A ``dictionary`` containing additional
+        `context` for the follow-up search
+    :param batch_size: (optional) The maximum count of GUIDs per follow-up
+        search. Default value: ``500``
+    :param max_concurrency: (optional) The maximum count of follow-up searches
+        to run at the same time. Default value: ``4``
+    :param page_size: (optional) The count of items to retrieve per page of
+        results. Default value: ``500``
+    :param timeout: (optional) The maximum amount of time (in seconds) to wait
+        for each follow-up search to finish
+    :return: A :class:`dxlmarclient.local.MergedResultsContext`
+    """
+    if batch_size < 1:
+        raise Exception("Batch size must be greater than or equal to 1")
+
+    if callable(guid_key):
+        extract_guid = guid_key
+    else:
+        def extract_guid(item):
+            return item[ResultConstants.ITEM_OUTPUT].get(guid_key)
+
+    def run_batch(ma_guids):
+        batch_context = dict(context or {})
+        batch_context["maGuids"] = ma_guids
+        return search_all_items(mar_client, projections, conditions,
+                                batch_context, page_size, timeout)
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        futures = [executor.submit(run_batch, batch) for batch in batches(
+            _distinct_guids(source, extract_guid, page_size), batch_size)]
+        return _merge([future.result() for future in futures])
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+from concurrent.futures import ThreadPoolExecutor
+from .constants import ConditionConstants, OperatorConstants
+from .constants import ProjectionConstants, ResultConstants
+from ._util import STRING_TYPES
+
+def sweep_projections(collector, output):
+    """
+    Returns the projections for a sweep search: the output being compared
+    along with the name of the host reporting it
+
+    :param collector: The collector name of the indicator type
+    :param output: The output name of the indicator type
+    :return: A ``list`` containing the `projections`
+    """
+    if collector == "HostInfo":
+        outputs = ["hostname"] if output == "hostname" else \
+            ["hostname", output]
+        return [{
+            ProjectionConstants.NAME: collector,
+            ProjectionConstants.OUTPUTS: outputs
+        }]
+    return [{
+        ProjectionConstants.NAME: "HostInfo",
+        ProjectionConstants.OUTPUTS: ["hostname"]
+    }, {
+        ProjectionConstants.NAME: collector,
+        ProjectionConstants.OUTPUTS: [output]
+    }]
+
+
+def normalize_indicator(value):
+    """
+    Normalizes an indicator value for comparison (indicators are compared
+    case insensitively)
+
+    :param value: The indicator value
+    :return: The normalized value
+    """
+    if value is None:
+        return None
+    if not isinstance(value, STRING_TYPES):
+        value = str(value)
+    return value.strip().lower()
+
+
+def _chunk_conditions(collector, output, values):
+    """
+    Returns the conditions for a sweep search: an ``or`` of the values of an
+    indicator type
+
+    :param collector: The collector name of the indicator type
+    :param output: The output name of the indicator type
+    :param values: The ``list`` of values
+    :return: A ``dictionary`` containing the `conditions`
+    """
+    return {ConditionConstants.OR: [{
+        ConditionConstants.AND: [{
+            ConditionConstants.COND_NAME: collector,
+            ConditionConstants.COND_OUTPUT: output,
+            ConditionConstants.COND_OP: OperatorConstants.EQUALS,
+            ConditionConstants.COND_VALUE: value
+        }]
+    } for value in values]}
+
+
+def _run_chunk(mar_client, chunk, context, page_size):
+    """
+    Runs the search for a chunk of indicator values
+
+    :param mar_client: The :class:`dxlmarclient.client.MarClient`
+    :param chunk: A ``tuple`` containing the indicator type and the ``list``
+        of values
+    :param context: A ``dictionary`` containing the `context` for the search
+    :param page_size: The count of items to retrieve per page of results
+    :return: A ``list`` of ``(key, value, item)`` tuples for each value
+        matched by a result item
+    """
+    key, values = chunk
+    collector, output = key.split("|", 1)
+    by_value = {}
+    for value in values:
+        by_value.setdefault(normalize_indicator(value), []).append(value)
+    results_context = mar_client.search(
+        sweep_projections(collector, output),
+        _chunk_conditions(collector, output, values), context)
+    chunk_hits = []
+    for item in results_context._iter_items(0, page_size):
+        matched = by_value.get(normalize_indicator(
+            item[ResultConstants.ITEM_OUTPUT].get(key)), [])
+        for value in matched:
+            chunk_hits.append((key, value, item))
+    return chunk_hits
+
+
+def sweep(mar_client, indicators, chunk_size=100, max_concurrency=4,
+          context=None, page_size=500):
+    """
+    Checks a large number of indicators via a set of chunked searches (see
+    :func:`dxlmarclient.client.MarClient.sweep`)
+
+    :param mar_client: The :class:`dxlmarclient.client.MarClient`
+    :param indicators: A ``dictionary`` mapping the indicator type to a
+        ``list`` of values to check
+    :param chunk_size: (optional) The maximum count of values per search.
+        Default value: ``100``
+    :param max_concurrency: (optional) The maximum count of searches to run
+        at the same time. Default value: ``4``
+    :param context: (optional) A ``dictionary`` containing the `context` for
+        each search
+    :param page_size: (optional) The count of items to retrieve per page of
+        results. Default value: ``500``
+    :return: A ``dictionary`` mapping each indicator type to a ``dictionary``
+        of each value to the ``list`` of result items that matched it
+    """
+    if chunk_size < 1:
+        raise Exception("Chunk size must be greater than or equal to 1")
+
+    hits = {}
+    chunks = []
+    for key, values in indicators.items():
+        hits[key] = {}
+        for value in values:
+            hits[key][value] = []
+        values = list(hits[key])
+        for index in range(0, len(values), chunk_size):
+            chunks.append((key, values[index:index + chunk_size]))
+
+    with ThreadPoolExecutor(max_workers=max_concurrency) as executor:
+        for chunk_hits in executor.map(
+                lambda chunk: _run_chunk(mar_client, chunk, context,
+                                         page_size), chunks):
+            for key, value, item in chunk_hits:
+                hits[key][value].append(item)
+
+    return hits
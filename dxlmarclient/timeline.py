@@ -0,0 +1,175 @@
+# -*- coding: utf-8 -*-
+################################################################################
+# Copyright (c) 2017 McAfee LLC - All Rights Reserved.
+################################################################################
+
+from __future__ import absolute_import
+import threading
+import time
+
+
+class SearchTimeline(object):
+    """
+    The progress of a search over time: a snapshot of the status counts
+    reported by the MAR server each time the status of the search is polled.
+
+    A timeline is recorded when a search is performed with
+    ``record_timeline=True`` (see :func:`dxlmarclient.client.MarClient.search`)
+    and is available via :attr:`dxlmarclient.results.ResultsContext.timeline`.
+    It can be used to tune the completion criteria and poll interval of
+    searches, for example by comparing the total duration of a search with the
+    time spent waiting for the last endpoints to respond.
+
+    **Example Usage**
+
+        .. code-block:: python
+
+            results_context = marclient.search(projections,
+                                               record_timeline=True)
+            timeline = results_context.timeline
+            print "First result after " + \\
+                str(timeline.time_to_first_result) + "s"
+            print "Waited " + str(timeline.straggler_wait()) + \\
+                "s for the last 5% of endpoints"
+    """
+
+    def __init__(self, start_time=None):
+        """
+        Constructor parameters:
+
+        :param start_time: (optional) The time (as returned by ``time.time()``)
+            at which the search was created. Defaults to the current time.
+        """
+        self.__start_time = time.time() if start_time is None else start_time
+        self.__snapshots = []
+        self.__lock = threading.Lock()
+
+    @property
+    def start_time(self):
+        """
+        The time (as returned by ``time.time()``) at which the search was
+        created
+        """
+        return self.__start_time
+
+    @property
+    def snapshots(self):
+        """
+        A ``list`` containing a ``dictionary`` for each status retrieved, in
+        order, with the following fields: ``time`` (seconds since the
+        :attr:`start_time`), ``results``, ``errors``, ``hosts``,
+        ``subscribedHosts`` and ``status``
+        """
+        with self.__lock:
+            return [dict(snapshot) for snapshot in self.__snapshots]
+
+    @property
+    def duration(self):
+        """
+        The time (in seconds) from the :attr:`start_time` to the last snapshot
+        """
+        with self.__lock:
+            return self.__snapshots[-1]["time"] if self.__snapshots else 0.0
+
+    @property
+    def time_to_first_result(self):
+        """
+        The time (in seconds) from the :attr:`start_time` to the first snapshot
+        that reported results (``None`` if no results have been reported)
+        """
+        for snapshot in self.snapshots:
+            if snapshot["results"]:
+                return snapshot["time"]
+        return None
+
+    def record(self, status_body, timestamp=None):
+        """
+        Records a status snapshot
+
+        :param status_body: The ``body`` of the MAR search status response
+        :param timestamp: (optional) The time (as returned by ``time.time()``)
+            at which the status was retrieved. Defaults to the current time.
+        """
+        timestamp = time.time() if timestamp is None else timestamp
+        snapshot = {
+            "time": max(timestamp - self.__start_time, 0.0),
+            "results": status_body["results"],
+            "errors": status_body["errors"],
+            "hosts": status_body["hosts"],
+            "subscribedHosts": status_body["subscribedHosts"],
+            "status": status_body["status"]
+        }
+        with self.__lock:
+            self.__snapshots.append(snapshot)
+
+    def host_response_curve(self):
+        """
+        Returns the fraction of subscribed endpoints that had responded at the
+        time of each snapshot
+
+        :return: A ``list`` of ``(time, coverage)`` tuples, where ``coverage``
+            is a value from ``0.0`` to ``1.0``
+        """
+        return [(snapshot["time"], float(snapshot["hosts"]) /
+                 snapshot["subscribedHosts"]
+                 if snapshot["subscribedHosts"] else 0.0)
+                for snapshot in self.snapshots]
+
+    def time_to_host_coverage(self, coverage):
+        """
+        Returns the time at which the fraction of subscribed endpoints that had
+        responded was first reported to be at least `coverage`
+
+        :param coverage: The fraction (``0.0`` to ``1.0``) of subscribed
+            endpoints
+        :return: The time (in seconds) from the :attr:`start_time`, or ``None``
+            if the coverage was not reached
+        """
+        for snapshot_time, snapshot_coverage in self.host_response_curve():
+            if snapshot_coverage >= coverage:
+                return snapshot_time
+        return None
+
+    def straggler_wait(self, fraction=0.05):
+        """
+        Returns the time spent waiting for the last `fraction` of the
+        subscribed endpoints to respond: the time from when ``1 - fraction``
+        of the endpoints had responded to the last snapshot
+
+        :param fraction: (optional) The fraction (``0.0`` to ``1.0``) of
+            endpoints considered to be stragglers. Default value: ``0.05``
+        :return: The time (in seconds), or ``None`` if ``1 - fraction`` of the
+            endpoints never responded
+        """
+        reached = self.time_to_host_coverage(1.0 - fraction)
+        if reached is None:
+            return None
+        return self.duration - reached
+
+    def report(self, straggler_fraction=0.05):
+        """
+        Returns a summary of the timeline
+
+        :param straggler_fraction: (optional) The fraction of endpoints
+            considered to be stragglers (see :func:`straggler_wait`). Default
+            value: ``0.05``
+        :return: A ``dictionary`` with the following fields: ``duration``,
+            ``polls`` (the count of snapshots), ``timeToFirstResult``,
+            ``timeToCoverage`` (the time at which ``1 - straggler_fraction``
+            of the endpoints had responded), ``stragglerWait`` and
+            ``stragglerWaitFraction`` (the straggler wait as a fraction of the
+            duration)
+        """
+        duration = self.duration
+        straggler_wait = self.straggler_wait(straggler_fraction)
+        return {
+            "duration": duration,
+            "polls": len(self.snapshots),
+            "timeToFirstResult": self.time_to_first_result,
+            "timeToCoverage": self.time_to_host_coverage(
+                1.0 - straggler_fraction),
+            "stragglerWait": straggler_wait,
+            "stragglerWaitFraction":
+                straggler_wait / duration
+                if straggler_wait is not None and duration else None
+        }
@@ -6,6 +6,7 @@ import os
 import distutils.command.sdist
 import distutils.log
 import subprocess
+import sys
 from setuptools import Command, setup
 import setuptools.command.sdist
 
@@ -38,6 +39,75 @@ class LintCommand(Command):
                               ["--rcfile", ".pylintrc.samples"])
 
 
+class ImportTimeCommand(Command):
+    """
+    Custom setuptools command for benchmarking the time taken to import the
+    package (guards against eagerly importing the DXL client libraries)
+    """
+    description = 'benchmark the time taken to import the package'
+    user_options = [
+        ("runs=", None, "count of interpreters to start (default: 5)"),
+        ("max-milliseconds=", None,
+         "fail if the median import time exceeds this value")
+    ]
+    def initialize_options(self):
+        self.runs = 5
+        self.max_milliseconds = None
+    def finalize_options(self):
+        self.runs = int(self.runs)
+        if self.max_milliseconds is not None:
+            self.max_milliseconds = float(self.max_milliseconds)
+    def run(self):
+        script = (
+            "import sys, time\n"
+            "start = time.time()\n"
+            "from dxlmarclient import OperatorConstants\n"
+            "elapsed = time.time() - start\n"
+            "eager = sys.version_info < (3, 7)\n"
+            "loaded = [name for name in ('dxlclient', 'dxlbootstrap') "
+            "if name in sys.modules]\n"
+            "print('%f %s' % (elapsed * 1000, "
+            "'' if eager else ','.join(loaded)))\n")
+        times = []
+        for _ in range(self.runs):
+            output = subprocess.check_output(
+                [sys.executable, "-c", script], cwd=CWD).decode().split()
+            if len(output) > 1:
+                raise Exception("Importing the package constants imported " +
+                                output[1])
+            times.append(float(output[0]))
+        median = sorted(times)[len(times) // 2]
+        self.announce("Median import time: %.1f ms (%d runs)" %
+                      (median, self.runs), level=distutils.log.INFO)
+        if self.max_milliseconds is not None and \
+                median > self.max_milliseconds:
+            raise Exception("Median import time exceeds %.1f ms" %
+                            self.max_milliseconds)
+
+
+class ChecksCommand(Command):
+    """
+    Custom setuptools command for running the checks in the ``checks``
+    directory against a local stand-in for the MAR service
+    """
+    description = 'run checks against a local stand-in for the MAR service'
+    user_options = []
+    def initialize_options(self):
+        pass
+    def finalize_options(self):
+        pass
+    def run(self):
+        env = dict(os.environ)
+        env["PYTHONPATH"] = os.pathsep.join(
+            [CWD] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+        for script in sorted(glob.glob(os.path.join(CWD, "checks", "*.py"))):
+            if os.path.basename(script) == "localmar.py":
+                continue
+            self.announce("Running " + os.path.basename(script),
+                          level=distutils.log.INFO)
+            subprocess.check_call([sys.executable, script], cwd=CWD, env=env)
+
+
 class CiCommand(Command):
     """
     Custom setuptools command for running steps that are performed during
@@ -51,6 +121,8 @@ class CiCommand(Command):
         pass
     def run(self):
         self.run_command("lint")
+        self.run_command("importtime")
+        self.run_command("checks")
 
 TEST_REQUIREMENTS = ["astroid<2.3.0", "pylint<=2.3.1"]
 
@@ -66,7 +138,9 @@ setup(
     # Requirements
     install_requires=[
         "dxlbootstrap>=0.2.0",
-        "dxlclient>=4.1.0.184"
+        "dxlclient>=4.1.0.184",
+        "futures; python_version == '2.7'",
+        "ipaddress; python_version == '2.7'"
     ],
 
     tests_require=TEST_REQUIREMENTS,
@@ -94,6 +168,12 @@ setup(
     package_data={
         "dxlmarclient._config.sample" : ['*']},
 
+    entry_points={
+        "console_scripts": [
+            "dxlmarclient-search = dxlmarclient.__main__:main"
+        ]
+    },
+
     # Details
     url="http://www.mcafee.com/",
 
@@ -118,7 +198,9 @@ setup(
     ],
 
     cmdclass={
+        "checks": ChecksCommand,
         "ci": CiCommand,
+        "importtime": ImportTimeCommand,
         "lint": LintCommand
     }
 )